@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+
+# --- MOTOR DE ANOMALIAS DE HORAS EXTRAS ---
+# Tudo é calculado com groupby/transform sobre a base mensal por colaborador,
+# sem laços em Python, para escalar a todas as empresas e competências carregadas.
+
+CHAVE_FUNC = ['Empresa', 'ID Func']
+
+def _zscore(valores, media, desvio):
+    z = (valores - media) / desvio.replace(0, np.nan)
+    return z.fillna(0.0)
+
+def base_mensal(df):
+    # Uma linha por colaborador x competência com as horas e valores somados
+    base = df.groupby(CHAVE_FUNC + ['Competência'], sort=False, observed=True).agg(
+        Nome=('Nome', 'first'),
+        Area=('Area', 'first'),
+        Horas=('Horas Decimais', 'sum'),
+        Valor=('Valor (R$)', 'sum')
+    ).reset_index()
+    base['Data_Ord'] = pd.to_datetime(base['Competência'], format='%m/%Y', errors='coerce')
+    return base.sort_values(CHAVE_FUNC + ['Data_Ord'], kind='stable').reset_index(drop=True)
+
+def detectar_anomalias(df, z_limite=2.0, fator_iqr=1.5, salto_limite=0.5, horas_minimas=10.0):
+    colunas = ['Empresa', 'ID Func', 'Nome', 'Area', 'Competência', 'Horas', 'Valor',
+               'Media Func', 'Z Func', 'Media Area', 'Z Area', 'Limite IQR', 'Variação Mensal',
+               'Pontuação', 'Motivos']
+    if df.empty or 'Area' not in df.columns: return pd.DataFrame(columns=colunas)
+
+    base = base_mensal(df)
+    horas = base['Horas']
+
+    # Linha de base do próprio colaborador ao longo das competências
+    g_func = base.groupby(CHAVE_FUNC, sort=False)['Horas']
+    base['Media Func'] = g_func.transform('mean')
+    base['Z Func'] = _zscore(horas, base['Media Func'], g_func.transform('std'))
+
+    # Linha de base da área em cada competência (z-score e cerca de Tukey)
+    g_area = base.groupby(['Area', 'Competência'], sort=False)['Horas']
+    base['Media Area'] = g_area.transform('mean')
+    base['Z Area'] = _zscore(horas, base['Media Area'], g_area.transform('std'))
+    q1 = g_area.transform('quantile', 0.25)
+    q3 = g_area.transform('quantile', 0.75)
+    base['Limite IQR'] = q3 + fator_iqr * (q3 - q1)
+
+    # Salto em relação à competência anterior do mesmo colaborador
+    anterior = g_func.shift(1)
+    base['Variação Mensal'] = ((horas - anterior) / anterior.where(anterior > 0)).fillna(0.0)
+
+    flag_z_area = base['Z Area'] >= z_limite
+    flag_z_func = base['Z Func'] >= z_limite
+    flag_iqr = horas > base['Limite IQR']
+    flag_salto = base['Variação Mensal'] >= salto_limite
+    relevante = horas >= horas_minimas
+
+    base['Pontuação'] = (
+        base['Z Area'].clip(lower=0) + base['Z Func'].clip(lower=0)
+        + base['Variação Mensal'].clip(lower=0, upper=5) + flag_iqr.astype(float)
+    ).round(2)
+
+    motivos = (
+        np.where(flag_z_area, 'Z Área; ', '') + np.where(flag_z_func, 'Z Individual; ', '')
+        + np.where(flag_iqr, 'IQR; ', '') + np.where(flag_salto, 'Salto Mensal; ', '')
+    )
+    base['Motivos'] = pd.Series(motivos, index=base.index).str.rstrip('; ')
+
+    marcados = base[relevante & (flag_z_area | flag_z_func | flag_iqr | flag_salto)]
+    return marcados.sort_values('Pontuação', ascending=False)[colunas].reset_index(drop=True)
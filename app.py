@@ -1,24 +1,7 @@
 import streamlit as st
-import pandas as pd
-import io
-import plotly.express as px
-import time
-from db_utils import (
-    verificar_login, 
-    salvar_dados_mongo, 
-    carregar_filtros_mongo, 
-    carregar_dados_mongo,
-    carregar_mapa_cargos_mongo,
-    salvar_mapa_cargos_mongo,
-    carregar_mapa_excecoes_mongo,
-    salvar_mapa_excecoes_mongo,
-    listar_todos_usuarios,
-    criar_usuario,
-    atualizar_status_usuario,
-    atualizar_dados_usuario
-)
-from relatorios import gerar_pdf_analitico, gerar_pdf_cenarios, gerar_excel_personalizado
 
+# Até o login só o Streamlit é carregado: pandas, plotly, pymongo, fpdf e os módulos
+# do projeto são importados depois da autenticação (ou no envio do formulário).
 # --- Configuração da Página ---
 st.set_page_config(
     page_title="Brasil Digital - Financeiro", 
@@ -59,7 +42,6 @@ st.markdown("""
 # --- SESSÃO ---
 if 'auth_status' not in st.session_state: st.session_state['auth_status'] = False
 if 'user_info' not in st.session_state: st.session_state['user_info'] = {}
-if 'df_financeiro' not in st.session_state: st.session_state['df_financeiro'] = pd.DataFrame()
 
 # ==============================================================================
 # TELA DE LOGIN
@@ -77,7 +59,8 @@ if not st.session_state['auth_status']:
             submit = st.form_submit_button("Entrar", type="primary")
             
             if submit:
-                if not st.secrets.get("MONGO_URI"):
+                from db_utils import ler_config, verificar_login
+                if not ler_config("MONGO_URI"):
                     st.error("ERRO: MONGO_URI não configurada nos secrets.")
                 else:
                     user_data = verificar_login(email, senha)
@@ -91,100 +74,132 @@ if not st.session_state['auth_status']:
                         st.error("E-mail ou senha incorretos.")
     st.stop()
 
+import time
+import json
+import hashlib
+import threading
+import importlib
+import pandas as pd
+from db_utils import (
+    ler_config,
+    salvar_dados_mongo, 
+    carregar_filtros_mongo, 
+    carregar_dados_mongo,
+    carregar_mapa_cargos_mongo,
+    salvar_alteracoes_mapa_cargos,
+    carregar_mapa_excecoes_mongo,
+    salvar_alteracoes_mapa_excecoes,
+    listar_todos_usuarios,
+    criar_usuario,
+    atualizar_status_usuario,
+    atualizar_dados_usuario,
+    obter_cache_compartilhado,
+    obter_cache_disco,
+    obter_cache_parse,
+    carregar_historico_funcionario
+)
+from relatorios import gerar_pdf_analitico, gerar_pdf_cenarios, gerar_pdf_analitico_partes, gerar_pdf_cenarios_partes, compactar_partes_pdf, LINHAS_POR_PARTE, gerar_excel_personalizado
+from anomalias import detectar_anomalias
+import processamento
+from processamento import aplicar_areas_otimizado, formatar_horas_decimal_para_str
+from graficos import metricas_dashboard, metricas_exportacao, figuras_dashboard, figuras_cenarios, figura_historico
+from cubo import calcular_cubo, cubo_vazio, horas_por_pessoa, pivot_eventos
+
+if 'df_financeiro' not in st.session_state: st.session_state['df_financeiro'] = pd.DataFrame()
+if 'versao_dados' not in st.session_state: st.session_state['versao_dados'] = ''
+
+# --- AQUECIMENTO DE MÓDULOS ---
+# Bibliotecas usadas só em gráficos/exportação são pré-carregadas numa thread em segundo
+# plano logo após o login, enquanto o usuário escolhe os filtros.
+MODULOS_PESADOS = ['plotly.express', 'fpdf', 'xlsxwriter', 'pyarrow', 'kaleido']
+
+@st.cache_resource
+def aquecer_modulos():
+    def _importar():
+        for nome in MODULOS_PESADOS:
+            try: importlib.import_module(nome)
+            except ImportError: pass
+    thread = threading.Thread(target=_importar, name="aquecimento-modulos", daemon=True)
+    thread.start()
+    return thread
+
+if str(ler_config("AQUECER_MODULOS", "1")).lower() not in ("0", "false", "nao", "não"):
+    aquecer_modulos()
+
 # ==============================================================================
 # FUNÇÕES DE PROCESSAMENTO
 # ==============================================================================
-@st.cache_data
-def converter_valor_monetario(valor_str):
-    if pd.isna(valor_str): return 0.0
-    try:
-        limpo = str(valor_str).replace('.', '').replace(',', '.')
-        return float(limpo)
-    except: return 0.0
-
-@st.cache_data
-def converter_horas(hora_str):
-    if pd.isna(hora_str): return 0.0
-    try:
-        limpo = str(hora_str).lower().replace('hs', '').strip()
-        partes = limpo.split(':')
-        return int(partes[0]) + (int(partes[1]) / 60)
-    except: return 0.0
-
-def formatar_horas_decimal_para_str(horas_decimal):
-    try:
-        horas = int(horas_decimal)
-        minutos = int((horas_decimal - horas) * 60)
-        return f"{horas:02d}:{minutos:02d}"
-    except: return "00:00"
-
-def extrair_metadados(linhas):
-    empresa = "Empresa Desconhecida"
-    competencia = "N/A"
-    for linha in linhas[:20]:
-        linha = linha.strip()
-        if " - " in linha and ";" in linha and ("Pág:" in linha or "Pag:" in linha):
-            partes = linha.split(';')
-            if len(partes) > 0:
-                raw_emp = partes[0].replace('"', '').strip()
-                empresa = raw_emp.split(" - ", 1)[1] if " - " in raw_emp else raw_emp
-        if "Período:" in linha:
-            try: competencia = linha.split(':')[1].split('à')[0].replace('"', '').strip()
-            except: pass
-    return empresa, competencia
-
-@st.cache_data(show_spinner=False)
-def processar_csv_financeiro(file_content, file_name):
-    try: decoded = file_content.decode("utf-8")
-    except UnicodeDecodeError: decoded = file_content.decode("latin-1")
-    
-    stringio = io.StringIO(decoded)
-    linhas = stringio.readlines()
-    empresa_atual, competencia_atual = extrair_metadados(linhas)
-    
-    dados = []
-    evento_atual = None
-    
-    for linha in linhas:
-        linha_clean = linha.strip()
-        if not linha_clean or linha_clean.startswith('_') or "Total" in linha_clean: continue
-        
-        if linha_clean.startswith('"Evento:') or linha_clean.startswith('Evento:'):
-            evento_atual = linha_clean.replace('"Evento:', '').replace('Evento:', '').replace('"', '').strip()
-            continue
-            
-        partes = linha_clean.split(';')
-        if len(partes) >= 6 and partes[0].replace('"', '').strip().isdigit():
-            try:
-                cargo_nome = partes[-4].replace('"', '').strip()
-                if cargo_nome.replace('.', '').isdigit(): cargo_nome = partes[2].replace('"', '').strip()
-
-                dados.append({
-                    'Empresa': empresa_atual,
-                    'Competência': competencia_atual,
-                    'ID Func': partes[0].replace('"', '').strip(),
-                    'Nome': partes[1].replace('"', '').strip(),
-                    'Cargo': cargo_nome,
-                    'Referência Original': partes[-2].replace('"', '').strip(),
-                    'Horas Decimais': converter_horas(partes[-2].replace('"', '').strip()),
-                    'Valor (R$)': converter_valor_monetario(partes[-1].replace('"', '').strip()),
-                    'Tipo de Evento': evento_atual,
-                    'Arquivo': file_name
-                })
-            except: continue
-    return pd.DataFrame(dados)
-
-def aplicar_areas_otimizado(df, mapa_cargos, mapa_excecoes):
-    if df.empty: return df
-    df_out = df.copy()
-    if 'Cargo' not in df_out.columns: df_out['Cargo'] = ''
-    if 'Nome' not in df_out.columns: df_out['Nome'] = ''
-
-    df_out['Area'] = df_out['Cargo'].map(mapa_cargos)
-    excecoes_series = df_out['Nome'].map(mapa_excecoes)
-    df_out['Area'] = excecoes_series.combine_first(df_out['Area'])
-    df_out['Area'] = df_out['Area'].fillna('Não Definido')
-    return df_out
+def digest_upload(file):
+    # Digest calculado uma vez por upload (file_id) e guardado na sessão: reruns não releem o arquivo
+    digests = st.session_state.setdefault('digests_upload', {})
+    if file.file_id not in digests: digests[file.file_id] = processamento.digest_conteudo(file)
+    return digests[file.file_id]
+
+# Memória do processo por cima do cache de parse em disco; a chave é o digest, não os bytes
+@st.cache_data(show_spinner=False, max_entries=64)
+def processar_csv_financeiro(_arquivo, digest, file_name):
+    return processamento.processar_com_cache(obter_cache_parse(), _arquivo, file_name, digest)
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def processar_upload_compactado(_arquivo, digest, file_name):
+    return processamento.processar_compactado_com_cache(obter_cache_parse(), file_name, _arquivo, digest)
+
+TAMANHO_PAGINA_EDITOR = 200
+
+def paginar_editor(df, chave):
+    total_paginas = max(1, -(-len(df) // TAMANHO_PAGINA_EDITOR))
+    pagina = 1
+    if total_paginas > 1:
+        pagina = st.number_input(f"Página (de {total_paginas})", min_value=1, max_value=total_paginas, value=1, key=f"pag_{chave}")
+    inicio = (pagina - 1) * TAMANHO_PAGINA_EDITOR
+    return df.iloc[inicio:inicio + TAMANHO_PAGINA_EDITOR].reset_index(drop=True)
+
+def diff_editor(original, editado, col_chave, col_valor):
+    # Compara a tabela exibida com a editada e devolve só o que mudou
+    antigo = original[col_valor].fillna('').astype(str).str.strip()
+    novo = editado[col_valor].fillna('').astype(str).str.strip()
+    mudou = novo != antigo
+    preenchido = mudou & (novo != '')
+    alterados = dict(zip(editado.loc[preenchido, col_chave], novo[preenchido]))
+    removidos = editado.loc[mudou & (novo == ''), col_chave].tolist()
+    return alterados, removidos
+
+def assinatura_mapas(mapa_cargos, mapa_excecoes):
+    conteudo = json.dumps([mapa_cargos, mapa_excecoes], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(conteudo.encode('utf-8')).hexdigest()
+
+def dados_com_areas(df, versao_dados, mapa_cargos, mapa_excecoes, versao_mapas):
+    # A base com a coluna Area também fica no cache compartilhado: sessões com os mesmos
+    # dados e mapas recebem o mesmo objeto (somente leitura) em vez de uma cópia cada
+    if not versao_dados: return aplicar_areas_otimizado(df, mapa_cargos, mapa_excecoes)
+    cache = obter_cache_compartilhado()
+    chave = ('areas', versao_dados, versao_mapas)
+    df_areas = cache.obter(chave)
+    if df_areas is None:
+        df_areas = cache.guardar(chave, aplicar_areas_otimizado(df, mapa_cargos, mapa_excecoes))
+    return df_areas
+
+@st.cache_data(show_spinner=False, max_entries=20)
+def calcular_anomalias(_df, versao_dados, versao_mapas, z_limite, fator_iqr, salto_limite, horas_minimas):
+    # _df não é hasheado: a chave do cache são as versões dos dados e dos mapas
+    return detectar_anomalias(_df, z_limite, fator_iqr, salto_limite, horas_minimas)
+
+def filtrar_dados(df_full, sel_areas, sel_cargos, sel_eventos):
+    mascara = pd.Series(True, index=df_full.index)
+    if sel_areas: mascara &= df_full['Area'].isin(sel_areas)
+    if sel_cargos: mascara &= df_full['Cargo'].isin(sel_cargos)
+    if sel_eventos: mascara &= df_full['Tipo de Evento'].isin(sel_eventos)
+    return df_full[mascara]
+
+# Cubo e figuras memorizados pelo estado dos filtros: um rerun sem mudança de filtro
+# não volta a varrer os dados nem a montar os gráficos.
+@st.cache_data(show_spinner=False, max_entries=32)
+def cubo_filtrado(_df_full, versao_dados, versao_mapas, sel_areas, sel_cargos, sel_eventos):
+    return calcular_cubo(filtrar_dados(_df_full, sel_areas, sel_cargos, sel_eventos))
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def figuras_filtradas(_cubo, versao_dados, versao_mapas, sel_areas, sel_cargos, sel_eventos):
+    return figuras_dashboard(_cubo)
 
 # ==============================================================================
 # ÁREA LOGADA
@@ -227,28 +242,40 @@ with abas[0]:
                     df_temp = carregar_dados_mongo(filtro_empresa_db, filtro_competencia_db)
                     if not df_temp.empty:
                         st.session_state['df_financeiro'] = df_temp
+                        st.session_state['versao_dados'] = df_temp.attrs.get('versao_dados', '')
                         st.success(f"{len(df_temp)} registros carregados!")
                     else: st.warning("Nenhum dado encontrado.")
     else:
-        uploaded_files = st.file_uploader("Carregar CSVs", type=["csv"], accept_multiple_files=True)
+        uploaded_files = st.file_uploader(
+            "Carregar CSVs ou pacotes compactados", type=["csv", "zip", "gz", "tgz"], accept_multiple_files=True,
+            help="Aceita .csv avulsos e pacotes .zip, .gz e .tar.gz com vários CSVs."
+        )
         if uploaded_files:
             dfs = []
-            for file in uploaded_files: dfs.append(processar_csv_financeiro(file.getvalue(), file.name))
+            for file in uploaded_files:
+                if processamento.eh_compactado(file.name):
+                    with st.spinner(f"Descompactando {file.name}..."):
+                        dfs.append(processar_upload_compactado(file, digest_upload(file), file.name))
+                else: dfs.append(processar_csv_financeiro(file, digest_upload(file), file.name))
             if dfs:
                 df_temp = pd.concat(dfs, ignore_index=True)
                 if not df_temp.empty:
                     st.session_state['df_financeiro'] = df_temp
+                    st.session_state['versao_dados'] = hashlib.sha1(repr(sorted(digest_upload(f) for f in uploaded_files)).encode('utf-8')).hexdigest()
                     st.success(f"{len(df_temp)} processados.")
                     if st.button("💾 SALVAR NO BANCO", type="primary"): 
                         with st.spinner("Salvando..."):
                             total = salvar_dados_mongo(df_temp)
-                        st.success(f"{total} salvos!")
+                        if total: st.success(f"{total} salvos!")
+                        else: st.error("Falha ao salvar ou ao atualizar a versão das partições. Tente salvar novamente.")
                         carregar_filtros_mongo.clear()
+                        carregar_historico_funcionario.clear()
 
     if 'df_financeiro' in st.session_state and not st.session_state['df_financeiro'].empty:
         mapa_cargos = carregar_mapa_cargos_mongo()
         mapa_excecoes = carregar_mapa_excecoes_mongo()
-        df_full = aplicar_areas_otimizado(st.session_state['df_financeiro'], mapa_cargos, mapa_excecoes)
+        versao_mapas = assinatura_mapas(mapa_cargos, mapa_excecoes)
+        df_full = dados_com_areas(st.session_state['df_financeiro'], st.session_state.get('versao_dados', ''), mapa_cargos, mapa_excecoes, versao_mapas)
         st.session_state['df_com_areas'] = df_full
 
         st.divider()
@@ -264,16 +291,11 @@ with abas[0]:
             eventos_disp = sorted(df_full['Tipo de Evento'].unique())
             sel_eventos = f3.multiselect("Filtrar Eventos", eventos_disp, default=eventos_disp)
 
-        df = df_full.copy()
-        if sel_areas: df = df[df['Area'].isin(sel_areas)]
-        if sel_cargos: df = df[df['Cargo'].isin(sel_cargos)]
-        if sel_eventos: df = df[df['Tipo de Evento'].isin(sel_eventos)]
+        chave_filtros = (st.session_state['versao_dados'], versao_mapas, tuple(sel_areas), tuple(sel_cargos), tuple(sel_eventos))
+        cubo = cubo_filtrado(df_full, *chave_filtros)
 
-        if not df.empty:
-            total_custo = df['Valor (R$)'].sum()
-            total_horas = df['Horas Decimais'].sum()
-            qtd_colab = df['ID Func'].nunique()
-            media = total_custo / qtd_colab if qtd_colab else 0
+        if not cubo_vazio(cubo):
+            total_custo, total_horas, qtd_colab, media = metricas_dashboard(cubo)
 
             k1, k2, k3, k4 = st.columns(4)
             k1.metric("💰 Custo Total", f"R$ {total_custo:,.2f}")
@@ -282,58 +304,40 @@ with abas[0]:
             k4.metric("📊 Ticket Médio", f"R$ {media:,.2f}")
 
             # Gráficos
-            fig_area = px.bar(
-                df.groupby('Area')['Valor (R$)'].sum().reset_index().sort_values('Valor (R$)'), 
-                x='Valor (R$)', y='Area', orientation='h', title="Custo por Área",
-                color_discrete_sequence=['#002776']
-            )
-            
-            fig_emp = px.pie(
-                df.groupby('Empresa')['Valor (R$)'].sum().reset_index(), 
-                values='Valor (R$)', names='Empresa', title="Custo por Empresa",
-                color_discrete_sequence=px.colors.sequential.Blues_r
-            )
-
-            df_line = df.groupby('Competência')['Valor (R$)'].sum().reset_index()
-            try:
-                df_line['Data_Ord'] = pd.to_datetime(df_line['Competência'], format='%m/%Y', errors='coerce')
-                df_line = df_line.sort_values('Data_Ord')
-            except: pass 
-            
-            fig_line = px.line(
-                df_line, x='Competência', y='Valor (R$)', markers=True, 
-                title="Evolução Mensal (Custo Total)",
-                color_discrete_sequence=['#009639']
-            )
-            fig_line.update_layout(xaxis=dict(type='category'))
+            fig_area, fig_emp, fig_line = figuras_filtradas(cubo, *chave_filtros)
 
             with st.container():
                 st.markdown("<div class='export-box'>", unsafe_allow_html=True)
                 st.markdown("### 📤 Central de Exportação")
                 col_exp1, col_exp2 = st.columns(2)
                 
-                metrics_export = {
-                    "Custo Total": f"R$ {total_custo:,.2f}",
-                    "Horas Totais": f"{total_horas:,.1f}",
-                    "Colaboradores": str(qtd_colab),
-                    "Ticket Medio": f"R$ {media:,.2f}"
-                }
+                metrics_export = metricas_exportacao(total_custo, total_horas, qtd_colab, media)
                 
                 with col_exp1:
+                    o1, o2 = st.columns(2)
+                    completo_dash = o1.checkbox("Detalhamento completo", key="pdf_completo_dash", help=f"Lista todos os registros em vez dos 50 primeiros. Acima de {LINHAS_POR_PARTE:,} registros sai um .zip com o PDF em partes.")
+                    grupo_dash = o2.selectbox("Subtotais por", ["Nenhum", "Empresa", "Area"], key="pdf_grupo_dash", disabled=not completo_dash)
                     if st.button("📄 Baixar Relatório PDF (Analítico)", type="primary", use_container_width=True):
                         with st.spinner("Renderizando PDF..."):
-                            pdf_bytes = gerar_pdf_analitico(df, metrics_export, [fig_area, fig_emp, fig_line], user['name'])
-                            st.download_button("⬇️ Clique para Download PDF", data=pdf_bytes, file_name="relatorio_financeiro.pdf", mime="application/pdf", key="pdf_down")
+                            df_pdf = filtrar_dados(df_full, sel_areas, sel_cargos, sel_eventos)
+                            figuras_pdf = [fig_area, fig_emp, fig_line]
+                            agrupar_dash = None if grupo_dash == "Nenhum" else grupo_dash
+                            if completo_dash and len(df_pdf) > LINHAS_POR_PARTE:
+                                zip_bytes = compactar_partes_pdf(gerar_pdf_analitico_partes(df_pdf, metrics_export, figuras_pdf, user['name'], agrupar_dash), "relatorio_financeiro")
+                                st.download_button("⬇️ Clique para Download PDF (partes .zip)", data=zip_bytes, file_name="relatorio_financeiro.zip", mime="application/zip", key="pdf_down")
+                            else:
+                                pdf_bytes = gerar_pdf_analitico(df_pdf, metrics_export, figuras_pdf, user['name'], detalhe_completo=completo_dash, agrupar_por=agrupar_dash)
+                                st.download_button("⬇️ Clique para Download PDF", data=pdf_bytes, file_name="relatorio_financeiro.pdf", mime="application/pdf", key="pdf_down")
                 
                 with col_exp2:
                     if st.button("📊 Baixar Excel Completo (XLSX)", type="primary", use_container_width=True):
                         with st.spinner("Gerando Excel..."):
-                            xls_bytes = gerar_excel_personalizado(df, "Dados Financeiros")
+                            xls_bytes = gerar_excel_personalizado(filtrar_dados(df_full, sel_areas, sel_cargos, sel_eventos), "Dados Financeiros")
                             st.download_button("⬇️ Clique para Download Excel", data=xls_bytes, file_name="dados_financeiros.xlsx", mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", key="xls_down")
                 st.markdown("</div>", unsafe_allow_html=True)
 
             st.divider()
-            subtab1, subtab2, subtab3 = st.tabs(["Visão Geral", "Inteligência", "Detalhado"])
+            subtab1, subtab2, subtab3, subtab4 = st.tabs(["Visão Geral", "Inteligência", "Detalhado", "Histórico Individual"])
             
             with subtab1:
                 c_viz1, c_viz2 = st.columns(2)
@@ -343,35 +347,51 @@ with abas[0]:
 
             with subtab2:
                 limite_horas = st.number_input("Alerta Horas >", value=100)
-                outliers = df.groupby(['Nome', 'Empresa', 'Area'])['Horas Decimais'].sum().reset_index()
+                outliers = horas_por_pessoa(cubo)
                 outliers = outliers[outliers['Horas Decimais'] > limite_horas].sort_values('Horas Decimais', ascending=False)
                 if not outliers.empty:
                     st.warning(f"{len(outliers)} pessoas acima do limite.")
                     st.dataframe(outliers, use_container_width=True)
                 else: st.success("Tudo OK.")
 
-            with subtab3:
-                def cat_evento(e):
-                    e = str(e).upper()
-                    if "60%" in e: return "60%"
-                    if "DSR" in e: return "DSR"
-                    return "OUTROS"
-                
-                df_detalhe = df.copy()
-                df_detalhe['Cat'] = df_detalhe['Tipo de Evento'].apply(cat_evento)
-                
-                pivot = df_detalhe.pivot_table(
-                    index=['ID Func', 'Nome', 'Cargo'], columns='Cat', 
-                    values=['Horas Decimais', 'Valor (R$)'], aggfunc='sum', fill_value=0
+                st.markdown("#### 🧠 Detecção Estatística de Anomalias")
+                a1, a2, a3, a4 = st.columns(4)
+                z_limite = a1.number_input("Z-score ≥", value=2.0, step=0.5)
+                fator_iqr = a2.number_input("Fator IQR", value=1.5, step=0.5)
+                salto_pct = a3.number_input("Salto Mensal ≥ (%)", value=50, step=10)
+                horas_minimas = a4.number_input("Horas Mínimas", value=10.0, step=5.0)
+
+                # Calculado sobre toda a base carregada; os filtros locais só recortam o resultado
+                anomalias = calcular_anomalias(
+                    df_full, st.session_state['versao_dados'], versao_mapas,
+                    z_limite, fator_iqr, salto_pct / 100, horas_minimas
                 )
-                pivot.columns = [f'{c[0]}|{c[1]}' for c in pivot.columns]
-                pivot = pivot.reset_index()
-                
-                for c in ['Horas Decimais|60%', 'Valor (R$)|60%', 'Horas Decimais|DSR', 'Valor (R$)|DSR']:
-                    if c not in pivot.columns: pivot[c] = 0.0
-                
-                cols_valor = [c for c in pivot.columns if 'Valor (R$)|' in c]
-                pivot['Total Geral (R$)'] = pivot[cols_valor].sum(axis=1)
+                anomalias = anomalias[anomalias['Area'].isin(cubo['celulas']['Area'].unique()) & anomalias['Empresa'].isin(cubo['celulas']['Empresa'].unique())]
+
+                if not anomalias.empty:
+                    r1, r2, r3, r4 = st.columns(4)
+                    r1.metric("Colaboradores Sinalizados", anomalias[['Empresa', 'ID Func']].drop_duplicates().shape[0])
+                    r2.metric("Fora da Cerca IQR", int(anomalias['Motivos'].str.contains('IQR').sum()))
+                    r3.metric("Z-score Alto", int(anomalias['Motivos'].str.contains('Z ').sum()))
+                    r4.metric("Saltos Mensais", int(anomalias['Motivos'].str.contains('Salto').sum()))
+                    st.dataframe(
+                        anomalias,
+                        column_config={
+                            "Horas": st.column_config.NumberColumn("Horas", format="%.1f"),
+                            "Valor": st.column_config.NumberColumn("Valor (R$)", format="R$ %.2f"),
+                            "Media Func": st.column_config.NumberColumn("Média Individual", format="%.1f"),
+                            "Z Func": st.column_config.NumberColumn("Z Individual", format="%.2f"),
+                            "Media Area": st.column_config.NumberColumn("Média Área", format="%.1f"),
+                            "Z Area": st.column_config.NumberColumn("Z Área", format="%.2f"),
+                            "Limite IQR": st.column_config.NumberColumn("Limite IQR", format="%.1f"),
+                            "Variação Mensal": st.column_config.NumberColumn("Variação Mensal", format="percent")
+                        },
+                        use_container_width=True, hide_index=True
+                    )
+                else: st.success("Nenhuma anomalia estatística encontrada.")
+
+            with subtab3:
+                pivot = pivot_eventos(cubo)
                 
                 pivot['Banco 60%'] = pivot['Horas Decimais|60%'].apply(formatar_horas_decimal_para_str)
                 pivot['Horas DSR'] = pivot['Horas Decimais|DSR'].apply(formatar_horas_decimal_para_str)
@@ -381,6 +401,35 @@ with abas[0]:
                 
                 st.dataframe(pivot[cols_final].style.format({"Valor (R$)|60%": "R$ {:,.2f}", "Valor (R$)|DSR": "R$ {:,.2f}", "Total Geral (R$)": "R$ {:,.2f}"}), use_container_width=True, hide_index=True)
 
+            with subtab4:
+                pessoas = cubo['funcionarios'][['ID Func', 'Nome', 'Empresa']].drop_duplicates().sort_values('Nome')
+                rotulos = (pessoas['Nome'].astype(str) + " (" + pessoas['ID Func'].astype(str) + " - " + pessoas['Empresa'].astype(str) + ")").tolist()
+                escolha = st.selectbox("Colaborador", range(len(rotulos)), format_func=lambda i: rotulos[i], index=None, placeholder="Digite o nome...")
+
+                if escolha is not None:
+                    id_sel, empresa_sel = pessoas['ID Func'].iloc[escolha], pessoas['Empresa'].iloc[escolha]
+                    # Histórico completo vem do banco (todas as competências); sem banco, usa a base carregada
+                    hist = carregar_historico_funcionario(id_sel, empresa_sel)
+                    if hist.empty:
+                        hist = df_full[(df_full['ID Func'] == id_sel) & (df_full['Empresa'] == empresa_sel)]
+                        hist = hist.groupby(['Empresa', 'Competência', 'Tipo de Evento'], sort=False)[['Horas Decimais', 'Valor (R$)']].sum().reset_index()
+
+                    mensal = hist.groupby('Competência')[['Horas Decimais', 'Valor (R$)']].sum().reset_index()
+                    mensal['Data_Ord'] = pd.to_datetime(mensal['Competência'], format='%m/%Y', errors='coerce')
+                    mensal = mensal.sort_values('Data_Ord')
+
+                    h1, h2, h3 = st.columns(3)
+                    h1.metric("Competências", len(mensal))
+                    h2.metric("Horas no Período", f"{mensal['Horas Decimais'].sum():,.1f}")
+                    h3.metric("Valor no Período", f"R$ {mensal['Valor (R$)'].sum():,.2f}")
+
+                    fig_hist = figura_historico(mensal)
+                    st.plotly_chart(fig_hist, use_container_width=True)
+
+                    por_evento = hist.pivot_table(index='Competência', columns='Tipo de Evento', values='Horas Decimais', aggfunc='sum', fill_value=0)
+                    por_evento = por_evento.reindex(mensal['Competência'])
+                    st.dataframe(por_evento.style.format("{:,.2f}"), use_container_width=True)
+
 # ==============================================================================
 # ABA 2: CENÁRIOS
 # ==============================================================================
@@ -422,22 +471,10 @@ with abas[1]:
             k3.metric("Dias Off Totais", f"{final['Dias'].sum():,.1f}")
             k4.metric("Pessoas Afetadas", str(len(final)))
 
+            fig_proj1, fig_proj2 = figuras_cenarios(final['Pagar'].sum(), final['Dias'].sum(), mcash, mfolga)
             col_g1, col_g2 = st.columns(2)
-            with col_g1:
-                proj_cash = pd.DataFrame({
-                    'Mês': [f'Mês {i+1}' for i in range(int(mcash))],
-                    'Valor (R$)': [final['Pagar'].sum()/mcash] * int(mcash)
-                })
-                fig_proj1 = px.bar(proj_cash, x='Mês', y='Valor (R$)', text_auto='.2s', title=f"Desembolso de Pagamento em {int(mcash)}x", color_discrete_sequence=['#002776'])
-                st.plotly_chart(fig_proj1, use_container_width=True)
-
-            with col_g2:
-                proj_folga = pd.DataFrame({
-                    'Mês': [f'Mês {i+1}' for i in range(int(mfolga))],
-                    'Dias Off da Equipe': [final['Dias'].sum()/mfolga] * int(mfolga)
-                })
-                fig_proj2 = px.bar(proj_folga, x='Mês', y='Dias Off da Equipe', text_auto='.1f', title=f"Diluição de Folgas em {int(mfolga)} meses", color_discrete_sequence=['#009639'])
-                st.plotly_chart(fig_proj2, use_container_width=True)
+            col_g1.plotly_chart(fig_proj1, use_container_width=True)
+            col_g2.plotly_chart(fig_proj2, use_container_width=True)
 
             with st.container():
                 st.markdown("<div class='export-box'>", unsafe_allow_html=True)
@@ -452,10 +489,18 @@ with abas[1]:
                 }
                 
                 with col_exp1:
+                    o1, o2 = st.columns(2)
+                    completo_cen = o1.checkbox("Detalhamento completo", key="pdf_completo_cen", help=f"Lista todos os colaboradores em vez dos 60 primeiros. Acima de {LINHAS_POR_PARTE:,} sai um .zip com o PDF em partes.")
+                    grupo_cen = o2.selectbox("Subtotais por", ["Nenhum", "Empresa", "Area"], key="pdf_grupo_cen", disabled=not completo_cen)
                     if st.button("📄 Baixar Relatório PDF (Cenários)", type="primary", use_container_width=True):
                         with st.spinner("Gerando PDF..."):
-                            pdf_cen = gerar_pdf_cenarios(final, metrics_sim, [fig_proj1, fig_proj2], user['name'])
-                            st.download_button("⬇️ Clique para Download PDF Cenários", data=pdf_cen, file_name="simulacao_cenarios.pdf", mime="application/pdf", key="pdf_cen")
+                            agrupar_cen = None if grupo_cen == "Nenhum" else grupo_cen
+                            if completo_cen and len(final) > LINHAS_POR_PARTE:
+                                zip_cen = compactar_partes_pdf(gerar_pdf_cenarios_partes(final, metrics_sim, [fig_proj1, fig_proj2], user['name'], agrupar_cen), "simulacao_cenarios")
+                                st.download_button("⬇️ Clique para Download PDF Cenários (partes .zip)", data=zip_cen, file_name="simulacao_cenarios.zip", mime="application/zip", key="pdf_cen")
+                            else:
+                                pdf_cen = gerar_pdf_cenarios(final, metrics_sim, [fig_proj1, fig_proj2], user['name'], detalhe_completo=completo_cen, agrupar_por=agrupar_cen)
+                                st.download_button("⬇️ Clique para Download PDF Cenários", data=pdf_cen, file_name="simulacao_cenarios.pdf", mime="application/pdf", key="pdf_cen")
                 
                 with col_exp2:
                     if st.button("📊 Baixar Excel Cenários (XLSX)", type="primary", use_container_width=True):
@@ -492,19 +537,31 @@ with abas[2]:
         st.subheader("1. Configuração por Cargos")
         mcargos = carregar_mapa_cargos_mongo()
         cexist = list(df_cur['Cargo'].unique()) if not df_cur.empty and 'Cargo' in df_cur.columns else []
-        all_c = sorted(list(set(cexist) | set(mcargos.keys())))
+        all_c = sorted(set(cexist) | set(mcargos.keys()))
         
         if all_c:
+            df_cargos = pd.DataFrame({"Cargo": all_c})
+            df_cargos["Area"] = df_cargos["Cargo"].map(mcargos).fillna("")
+
+            busca_cargo = st.text_input("🔎 Buscar cargo", key="busca_cargo")
+            if busca_cargo:
+                df_cargos = df_cargos[df_cargos["Cargo"].astype(str).str.contains(busca_cargo, case=False, regex=False)]
+            pagina_cargos = paginar_editor(df_cargos, "cargos")
+
             edit = st.data_editor(
-                pd.DataFrame([{"Cargo": c, "Area": mcargos.get(c, "")} for c in all_c]), 
+                pagina_cargos, 
                 use_container_width=True, 
-                hide_index=True
+                hide_index=True,
+                column_config={"Cargo": st.column_config.TextColumn(disabled=True)}
             )
             if st.button("💾 Salvar Regras de Cargos", type="primary"):
-                salvar_mapa_cargos_mongo({r['Cargo']: r['Area'] for _, r in edit.iterrows() if r['Area']})
-                st.success("Regras de Cargos atualizadas!")
-                time.sleep(1)
-                st.rerun()
+                alterados, removidos = diff_editor(pagina_cargos, edit, "Cargo", "Area")
+                if alterados or removidos:
+                    salvar_alteracoes_mapa_cargos(alterados, removidos)
+                    st.success(f"Regras de Cargos atualizadas! ({len(alterados) + len(removidos)} alterações)")
+                    time.sleep(1)
+                    st.rerun()
+                else: st.info("Nenhuma alteração para salvar.")
         else:
             st.info("Nenhum cargo encontrado (carregue dados primeiro).")
     
@@ -515,22 +572,17 @@ with abas[2]:
         if not df_cur.empty and 'Nome' in df_cur.columns and 'Cargo' in df_cur.columns:
             cargos_disponiveis = sorted(df_cur['Cargo'].unique())
             cargo_filtro = st.selectbox("Selecione um Cargo para filtrar:", ["Todos"] + cargos_disponiveis)
+            busca_nome = st.text_input("🔎 Buscar pessoa", key="busca_nome")
             
             df_pessoas = df_cur[['Nome', 'Cargo']].drop_duplicates().sort_values('Nome')
             
             if cargo_filtro != "Todos":
                 df_pessoas = df_pessoas[df_pessoas['Cargo'] == cargo_filtro]
+            if busca_nome:
+                df_pessoas = df_pessoas[df_pessoas['Nome'].astype(str).str.contains(busca_nome, case=False, regex=False)]
             
-            lista_pessoas = []
-            for _, row in df_pessoas.iterrows():
-                nome = row['Nome']
-                lista_pessoas.append({
-                    "Nome": nome, 
-                    "Cargo": row['Cargo'], 
-                    "Área (Exceção)": mexc.get(nome, "")
-                })
-                
-            df_editor_pessoas = pd.DataFrame(lista_pessoas)
+            df_pessoas = df_pessoas.assign(**{"Área (Exceção)": df_pessoas['Nome'].map(mexc).fillna("")})
+            df_editor_pessoas = paginar_editor(df_pessoas, "excecoes")
             
             edit_exc = st.data_editor(
                 df_editor_pessoas, 
@@ -543,21 +595,13 @@ with abas[2]:
             )
             
             if st.button("💾 Salvar Exceções", type="primary"):
-                mapa_final = mexc.copy()
-                
-                for _, r in edit_exc.iterrows():
-                    nome_pessoa = r['Nome']
-                    area_exc = r['Área (Exceção)']
-                    
-                    if area_exc and str(area_exc).strip() != "":
-                        mapa_final[nome_pessoa] = area_exc
-                    elif nome_pessoa in mapa_final:
-                        del mapa_final[nome_pessoa]
-                        
-                salvar_mapa_excecoes_mongo(mapa_final)
-                st.success("Exceções atualizadas com sucesso!")
-                time.sleep(1)
-                st.rerun()
+                alterados, removidos = diff_editor(df_editor_pessoas, edit_exc, "Nome", "Área (Exceção)")
+                if alterados or removidos:
+                    salvar_alteracoes_mapa_excecoes(alterados, removidos)
+                    st.success(f"Exceções atualizadas com sucesso! ({len(alterados) + len(removidos)} alterações)")
+                    time.sleep(1)
+                    st.rerun()
+                else: st.info("Nenhuma alteração para salvar.")
         else: 
             st.info("Carregue dados no Dashboard para configurar exceções.")
 
@@ -597,3 +641,32 @@ if is_admin:
                             if st.button("🚫 Desativar" if act else "✅ Ativar", key=f"btn_{u['email']}"):
                                 atualizar_status_usuario(u['email'], not act)
                                 st.rerun()
+
+        st.divider()
+        st.subheader("📦 Cache de Dados (Processo)")
+        cache = obter_cache_compartilhado()
+        stats = cache.estatisticas()
+        m1, m2, m3, m4 = st.columns(4)
+        m1.metric("Memória", f"{stats['memoria_mb']:,.1f} / {stats['limite_mb']:,.0f} MB")
+        m2.metric("Partições/Seleções", stats['itens'])
+        m3.metric("Acertos / Falhas", f"{stats['acertos']} / {stats['falhas']}")
+        m4.metric("Despejos (LRU)", stats['despejos'])
+        disco = obter_cache_disco()
+        if disco is not None:
+            stats_disco = disco.estatisticas()
+            d1, d2, d3 = st.columns(3)
+            d1.metric("Disco", f"{stats_disco['disco_mb']:,.1f} / {stats_disco['limite_mb']:,.0f} MB")
+            d2.metric("Acertos / Falhas (Disco)", f"{stats_disco['acertos']} / {stats_disco['falhas']}")
+            d3.metric("Despejos (Disco)", stats_disco['despejos'])
+        cache_parse = obter_cache_parse()
+        if cache_parse is not None:
+            stats_parse = cache_parse.estatisticas()
+            p1, p2, p3 = st.columns(3)
+            p1.metric("Cache de Parse (CSV)", f"{stats_parse['disco_mb']:,.1f} / {stats_parse['limite_mb']:,.0f} MB")
+            p2.metric("Acertos / Falhas (Parse)", f"{stats_parse['acertos']} / {stats_parse['falhas']}")
+            p3.metric("Despejos (Parse)", stats_parse['despejos'])
+        if st.button("🧹 Limpar Cache"):
+            cache.limpar()
+            if disco is not None: disco.limpar()
+            if cache_parse is not None: cache_parse.limpar()
+            st.rerun()
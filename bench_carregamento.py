@@ -0,0 +1,46 @@
+import sys
+import time
+from db_utils import get_db, buscar_particoes_mongo, carregar_filtros_mongo, colecao_folha, garantir_indices_particoes
+
+# Uso: python bench_carregamento.py [repetições] [paralelo]
+# Compara a busca com um único cursor contra a busca paralela por partição,
+# sem passar pelos caches (memória/disco). Lê MONGO_URI de .streamlit/secrets.toml.
+# O índice (Empresa, Competência) é criado antes da medição e o plano da consulta
+# de uma partição é exibido: sem IXSCAN a comparação não tem valor.
+
+def medir(db, pares, paralelo, repeticoes):
+    tempos = []
+    linhas = 0
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        grupos = buscar_particoes_mongo(db, pares, paralelo=paralelo)
+        tempos.append(time.perf_counter() - inicio)
+        linhas = sum(len(g) for g in grupos.values())
+    return min(tempos), sum(tempos) / len(tempos), linhas
+
+def plano_particao(db, empresa, competencia):
+    try:
+        plano = colecao_folha(db).find({"Empresa": empresa, "Competência": competencia}).explain()
+        etapa = plano.get('queryPlanner', {}).get('winningPlan', {})
+        etapas = []
+        while etapa:
+            etapas.append(etapa.get('stage', '?'))
+            etapa = etapa.get('inputStage')
+        return " <- ".join(etapas) or "?"
+    except Exception as e: return f"indisponível ({e})"
+
+if __name__ == "__main__":
+    repeticoes = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    paralelo = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+
+    db = get_db()
+    if db is None: sys.exit("MONGO_URI não configurada.")
+    empresas, competencias = carregar_filtros_mongo()
+    pares = [(e, c) for e in empresas for c in competencias]
+    print(f"{len(pares)} partições, {repeticoes} repetições")
+    print(f"Índice de partição: {'ok' if garantir_indices_particoes() else 'falhou'}")
+    if pares: print(f"Plano da consulta por partição: {plano_particao(db, *pares[0])}")
+
+    for nome, p in [("Cursor único", 1), (f"Paralelo ({paralelo})", paralelo)]:
+        melhor, media, linhas = medir(db, pares, p, repeticoes)
+        print(f"{nome:<16} melhor {melhor:7.2f}s | média {media:7.2f}s | {linhas} linhas | {linhas / melhor:,.0f} linhas/s")
@@ -0,0 +1,76 @@
+import os
+import sys
+import json
+import time
+import subprocess
+
+# Uso: python bench_inicializacao.py [repetições]
+# Mede, em processos novos (imports a frio), o tempo até a tela de login
+# e até o primeiro dashboard com dados, usando o AppTest do Streamlit.
+
+# plotly.express (e não plotly): o próprio streamlit já importa o pacote base plotly
+MODULOS_OBSERVADOS = ['pandas', 'plotly.express', 'pymongo', 'fpdf', 'xlsxwriter', 'pyarrow']
+DIRETORIO = os.path.dirname(os.path.abspath(__file__))
+
+def _amostra(n=5000):
+    import numpy as np
+    import pandas as pd
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        'Empresa': rng.choice(['Empresa A', 'Empresa B'], n),
+        'Competência': rng.choice(['01/2025', '02/2025', '03/2025'], n),
+        'ID Func': rng.integers(0, 800, n).astype(str),
+        'Nome': rng.choice(['Ana', 'Bruno', 'Carla', 'Diego'], n),
+        'Cargo': rng.choice(['Operador', 'Analista'], n),
+        'Referência Original': '01:00',
+        'Horas Decimais': rng.exponential(5, n),
+        'Valor (R$)': rng.exponential(80, n),
+        'Tipo de Evento': rng.choice(['HE 60%', 'DSR s/ HE'], n),
+        'Arquivo': 'amostra.csv'
+    })
+
+def _medir(etapa):
+    # Executado no subprocesso: o Streamlit já carregado equivale ao servidor em pé.
+    # A fotografia dos módulos vem antes do AppTest e da amostra (que importam pandas),
+    # para que a coluna "importados" mostre o que a execução carrega de fato.
+    import streamlit
+    carregados_antes = {m: m in sys.modules for m in MODULOS_OBSERVADOS}
+    from streamlit.testing.v1 import AppTest
+    os.environ.setdefault("AQUECER_MODULOS", "0")
+    at = AppTest.from_file(os.path.join(DIRETORIO, "app.py"), default_timeout=300)
+    if etapa == "dashboard":
+        at.session_state['auth_status'] = True
+        at.session_state['user_info'] = {'name': 'Benchmark', 'role': 'usuario', 'email': 'bench@local'}
+        at.session_state['df_financeiro'] = _amostra()
+
+    inicio = time.perf_counter()
+    at.run()
+    tempo = time.perf_counter() - inicio
+    print(json.dumps({
+        "etapa": etapa,
+        "segundos": tempo,
+        "erros": [str(e.value) for e in at.exception],
+        "modulos": {m: m in sys.modules and not carregados_antes[m] for m in MODULOS_OBSERVADOS}
+    }))
+
+def _rodar(etapa):
+    saida = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--interno", etapa],
+        cwd=DIRETORIO, capture_output=True, text=True
+    )
+    for linha in reversed(saida.stdout.strip().splitlines()):
+        if linha.startswith("{"): return json.loads(linha)
+    raise RuntimeError(saida.stderr[-2000:])
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == "--interno":
+        _medir(sys.argv[2])
+        sys.exit(0)
+
+    repeticoes = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    for etapa, nome in [("login", "Tela de login"), ("dashboard", "Primeiro dashboard")]:
+        resultados = [_rodar(etapa) for _ in range(repeticoes)]
+        tempos = [r["segundos"] for r in resultados]
+        carregados = [m for m, ok in resultados[-1]["modulos"].items() if ok]
+        print(f"{nome:<20} melhor {min(tempos):6.2f}s | média {sum(tempos) / len(tempos):6.2f}s | importados na execução: {', '.join(carregados) or '-'}")
+        if resultados[-1]["erros"]: print(f"  erros: {resultados[-1]['erros']}")
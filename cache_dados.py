@@ -0,0 +1,201 @@
+import os
+import glob
+import hashlib
+import threading
+from collections import OrderedDict
+
+# --- CACHE COMPARTILHADO DE PARTIÇÕES (POR PROCESSO) ---
+# Os DataFrames guardados aqui são compartilhados entre todas as sessões:
+# quem recebe um deles deve tratá-lo como somente leitura (copiar antes de alterar).
+
+def tamanho_dataframe(df):
+    try: return int(df.memory_usage(index=True, deep=True).sum())
+    except: return 0
+
+class CacheParticoes:
+    def __init__(self, limite_bytes):
+        self.limite_bytes = limite_bytes
+        self._itens = OrderedDict()  # chave -> df
+        # O mesmo objeto pode estar sob várias chaves (ex.: seleção de uma partição só):
+        # o tamanho é contado uma vez por objeto, por id(), com contagem de referências
+        self._objetos = {}  # id(df) -> [tamanho, referências]
+        self._lock = threading.Lock()
+        self.bytes_usados = 0
+        self.acertos = 0
+        self.falhas = 0
+        self.despejos = 0
+
+    def obter(self, chave):
+        with self._lock:
+            df = self._itens.get(chave)
+            if df is None:
+                self.falhas += 1
+                return None
+            self._itens.move_to_end(chave)
+            self.acertos += 1
+            return df
+
+    def _soltar(self, df):
+        objeto = self._objetos[id(df)]
+        objeto[1] -= 1
+        if objeto[1] == 0:
+            del self._objetos[id(df)]
+            self.bytes_usados -= objeto[0]
+
+    def guardar(self, chave, df):
+        with self._lock:
+            existente = self._itens.get(chave)
+            if existente is not None:
+                # Outra sessão já carregou a mesma partição: devolve a referência existente
+                self._itens.move_to_end(chave)
+                return existente
+            compartilhado = id(df) in self._objetos
+        # O tamanho é medido fora do lock (memory_usage deep pode ser lento)
+        tamanho = None if compartilhado else tamanho_dataframe(df)
+        # Itens maiores que o orçamento inteiro não são guardados
+        if tamanho is not None and tamanho > self.limite_bytes: return df
+
+        with self._lock:
+            existente = self._itens.get(chave)
+            if existente is not None:
+                self._itens.move_to_end(chave)
+                return existente
+
+            objeto = self._objetos.get(id(df))
+            if objeto is None:
+                if tamanho is None:
+                    # Outra thread despejou a última chave do objeto entre os dois locks
+                    tamanho = tamanho_dataframe(df)
+                    if tamanho > self.limite_bytes: return df
+                self._objetos[id(df)] = [tamanho, 1]
+                self.bytes_usados += tamanho
+            else: objeto[1] += 1
+            self._itens[chave] = df
+            while self.bytes_usados > self.limite_bytes and self._itens:
+                _, antigo = self._itens.popitem(last=False)
+                self._soltar(antigo)
+                self.despejos += 1
+        return df
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+            self._objetos.clear()
+            self.bytes_usados = 0
+
+    def estatisticas(self):
+        with self._lock:
+            total = self.acertos + self.falhas
+            return {
+                "itens": len(self._itens),
+                "objetos": len(self._objetos),
+                "memoria_mb": self.bytes_usados / (1024 * 1024),
+                "limite_mb": self.limite_bytes / (1024 * 1024),
+                "acertos": self.acertos,
+                "falhas": self.falhas,
+                "despejos": self.despejos,
+                "taxa_acerto": (self.acertos / total) if total else 0.0
+            }
+
+# --- CACHE EM DISCO (ARROW IPC, MAPEADO EM MEMÓRIA) ---
+# Sobrevive a reinícios do app: cada partição é gravada uma vez após a busca
+# e relida via memory-map. O nome do arquivo carrega a versão dos dados.
+
+class CacheDisco:
+    def __init__(self, diretorio, limite_bytes):
+        self.diretorio = diretorio
+        self.limite_bytes = limite_bytes
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+        self.despejos = 0
+        os.makedirs(diretorio, exist_ok=True)
+
+    def _prefixo(self, chave):
+        return hashlib.sha1(str(chave).encode('utf-8')).hexdigest()
+
+    def _caminho(self, chave, versao):
+        return os.path.join(self.diretorio, f"{self._prefixo(chave)}-{versao}.arrow")
+
+    def obter(self, chave, versao=0):
+        import pyarrow as pa
+        caminho = self._caminho(chave, versao)
+        try:
+            with pa.memory_map(caminho, 'r') as origem:
+                tabela = pa.ipc.open_file(origem).read_all()
+                meta = tabela.schema.metadata or {}
+                if meta.get(b'chave') != str(chave).encode('utf-8') or meta.get(b'versao') != str(versao).encode('utf-8'):
+                    self.falhas += 1
+                    return None
+                df = tabela.to_pandas(split_blocks=True)
+            os.utime(caminho)  # marca como usado recentemente para a política LRU
+            self.acertos += 1
+            return df
+        except (FileNotFoundError, OSError, pa.ArrowException):
+            self.falhas += 1
+            return None
+
+    def guardar(self, chave, df, versao=0):
+        import pyarrow as pa
+        caminho = self._caminho(chave, versao)
+        temporario = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            tabela = pa.Table.from_pandas(df, preserve_index=False)
+            meta = dict(tabela.schema.metadata or {})
+            meta.update({b'chave': str(chave).encode('utf-8'), b'versao': str(versao).encode('utf-8')})
+            tabela = tabela.replace_schema_metadata(meta)
+            # Sem compressão para que a leitura possa ser feita direto do memory-map
+            with pa.OSFile(temporario, 'wb') as destino:
+                with pa.ipc.new_file(destino, tabela.schema) as escritor:
+                    escritor.write_table(tabela)
+            os.replace(temporario, caminho)
+        except Exception:
+            try: os.remove(temporario)
+            except OSError: pass
+            return False
+
+        # Versões antigas da mesma chave deixam de ser válidas
+        for antigo in glob.glob(os.path.join(self.diretorio, f"{self._prefixo(chave)}-*.arrow")):
+            if antigo != caminho:
+                try: os.remove(antigo)
+                except OSError: pass
+        self._aplicar_limite()
+        return True
+
+    def _aplicar_limite(self):
+        with self._lock:
+            arquivos = []
+            for caminho in glob.glob(os.path.join(self.diretorio, "*.arrow")):
+                try:
+                    info = os.stat(caminho)
+                    arquivos.append((info.st_mtime, info.st_size, caminho))
+                except OSError: continue
+            total = sum(a[1] for a in arquivos)
+            for _, tamanho, caminho in sorted(arquivos):
+                if total <= self.limite_bytes: break
+                try:
+                    os.remove(caminho)
+                    total -= tamanho
+                    self.despejos += 1
+                except OSError: continue
+
+    def uso_bytes(self):
+        total = 0
+        for caminho in glob.glob(os.path.join(self.diretorio, "*.arrow")):
+            try: total += os.path.getsize(caminho)
+            except OSError: continue
+        return total
+
+    def limpar(self):
+        for caminho in glob.glob(os.path.join(self.diretorio, "*.arrow")):
+            try: os.remove(caminho)
+            except OSError: pass
+
+    def estatisticas(self):
+        return {
+            "disco_mb": self.uso_bytes() / (1024 * 1024),
+            "limite_mb": self.limite_bytes / (1024 * 1024),
+            "acertos": self.acertos,
+            "falhas": self.falhas,
+            "despejos": self.despejos
+        }
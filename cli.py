@@ -0,0 +1,167 @@
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from functools import partial
+from processamento import aplicar_areas_otimizado, eh_compactado, processar_com_cache, processar_compactado_com_cache
+from cache_dados import CacheDisco
+
+# --- EXECUÇÃO SEM INTERFACE (ROTINA NOTURNA) ---
+# Uso:
+#   python cli.py ingerir <diretório com CSVs/.zip/.gz/.tar.gz> [--workers N] [--sem-salvar] [--sem-cache]
+#   python cli.py relatorios <diretório de saída> [--empresas ...] [--competencias ...] [--formatos pdf xlsx]
+#                            [--completo] [--agrupar Area|Competência] [--linhas-por-parte N]
+# MONGO_URI (e demais chaves) podem vir de variáveis de ambiente ou de .streamlit/secrets.toml.
+
+def listar_csvs(diretorio):
+    # CSVs avulsos e pacotes .zip / .gz / .tar.gz
+    arquivos = []
+    for raiz, _, nomes in os.walk(diretorio):
+        arquivos.extend(os.path.join(raiz, n) for n in nomes if n.lower().endswith('.csv') or eh_compactado(n))
+    return sorted(arquivos)
+
+_CACHES_PARSE = {}
+
+def _cache_parse(diretorio, limite_mb):
+    # Um CacheDisco por processo do pool, apontando para o mesmo diretório do app
+    if not diretorio: return None
+    if diretorio not in _CACHES_PARSE:
+        try: _CACHES_PARSE[diretorio] = CacheDisco(diretorio, int(limite_mb * 1024 * 1024))
+        except OSError: _CACHES_PARSE[diretorio] = None
+    return _CACHES_PARSE[diretorio]
+
+def _processar_arquivo(caminho, diretorio_cache=None, limite_cache_mb=1024):
+    nome = os.path.basename(caminho)
+    cache = _cache_parse(diretorio_cache, limite_cache_mb)
+    with open(caminho, 'rb') as f:
+        if eh_compactado(nome):
+            df = processar_compactado_com_cache(cache, nome, f, max_workers=2)
+        else:
+            df = processar_com_cache(cache, f, nome)
+    return df, os.path.getsize(caminho)
+
+def _nome_seguro(texto):
+    return "".join(c if c.isalnum() else '_' for c in str(texto)).strip('_') or "empresa"
+
+def comando_ingerir(args):
+    from db_utils import salvar_dados_mongo, get_db, ler_config
+
+    arquivos = listar_csvs(args.diretorio)
+    if not arquivos:
+        print("Nenhum CSV ou pacote compactado encontrado.")
+        return 1
+    if not args.sem_salvar and get_db() is None:
+        print("MONGO_URI não configurada.")
+        return 1
+
+    # Resolvidos aqui (ambiente, depois secrets.toml), como no app, e repassados aos workers
+    diretorio_cache = None if args.sem_cache else ler_config("CACHE_PARSE_DIR", ".cache_parse")
+    limite_cache_mb = float(ler_config("CACHE_PARSE_MB", 1024))
+    processar = partial(_processar_arquivo, diretorio_cache=diretorio_cache, limite_cache_mb=limite_cache_mb)
+
+    inicio = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        resultados = list(executor.map(processar, arquivos, chunksize=4))
+    tempo_parse = time.perf_counter() - inicio
+
+    bytes_lidos = sum(r[1] for r in resultados)
+    dfs = [r[0] for r in resultados if not r[0].empty]
+    df = pd.concat(dfs, ignore_index=True) if dfs else pd.DataFrame()
+
+    total_salvos = 0
+    if not df.empty and not args.sem_salvar:
+        # Grava uma partição Empresa x Competência por vez para limitar o tamanho de cada bulk_write
+        for _, parte in df.groupby(['Empresa', 'Competência'], sort=False):
+            salvos = salvar_dados_mongo(parte.reset_index(drop=True))
+            if not salvos: print(f"Falha ao gravar {parte['Empresa'].iloc[0]} {parte['Competência'].iloc[0]} (dados ou versão da partição).")
+            total_salvos += salvos
+    tempo_total = time.perf_counter() - inicio
+
+    print(f"Arquivos: {len(arquivos)} | {bytes_lidos / (1024 * 1024):,.1f} MB | {len(df)} registros")
+    print(f"Parse: {tempo_parse:,.2f}s ({bytes_lidos / (1024 * 1024) / max(tempo_parse, 1e-9):,.1f} MB/s)")
+    if not args.sem_salvar: print(f"Gravados no banco: {total_salvos}")
+    print(f"Total: {tempo_total:,.2f}s ({len(df) / max(tempo_total, 1e-9):,.0f} registros/s)")
+    return 0
+
+def comando_relatorios(args):
+    from db_utils import carregar_filtros_mongo, carregar_dados_mongo, carregar_mapa_cargos_mongo, carregar_mapa_excecoes_mongo
+    from relatorios import gerar_pdf_analitico, gerar_pdf_analitico_partes, gerar_excel_personalizado, LINHAS_POR_PARTE
+    from graficos import metricas_dashboard, metricas_exportacao, figuras_dashboard
+    from cubo import calcular_cubo
+
+    opcoes_empresas, opcoes_competencias = carregar_filtros_mongo()
+    empresas = args.empresas or opcoes_empresas
+    if args.competencias:
+        competencias = args.competencias
+    else:
+        # Padrão: a competência mais recente do banco
+        ordem = pd.to_datetime(pd.Series(opcoes_competencias, dtype=object), format='%m/%Y', errors='coerce')
+        competencias = [opcoes_competencias[ordem.fillna(pd.Timestamp.min).argmax()]] if opcoes_competencias else []
+    if not empresas or not competencias:
+        print("Nada para gerar (sem empresas/competências no banco).")
+        return 1
+
+    inicio = time.perf_counter()
+    df_all = carregar_dados_mongo(empresas, competencias)
+    if df_all.empty:
+        print("Nenhum dado encontrado.")
+        return 1
+    df_all = aplicar_areas_otimizado(df_all, carregar_mapa_cargos_mongo(), carregar_mapa_excecoes_mongo())
+    tempo_carga = time.perf_counter() - inicio
+
+    os.makedirs(args.saida, exist_ok=True)
+    gerados = 0
+    for empresa, df_emp in df_all.groupby('Empresa', sort=True):
+        base = os.path.join(args.saida, _nome_seguro(empresa))
+        if 'pdf' in args.formatos:
+            cubo = calcular_cubo(df_emp)
+            metricas = metricas_exportacao(*metricas_dashboard(cubo))
+            figuras = list(figuras_dashboard(cubo))
+            if args.completo:
+                # Uma parte por vez em disco: a memória fica limitada a uma parte do PDF
+                partes = gerar_pdf_analitico_partes(df_emp, metricas, figuras, args.usuario, args.agrupar, args.linhas_por_parte or LINHAS_POR_PARTE)
+                for i, conteudo in enumerate(partes, start=1):
+                    with open(f"{base}_parte{i:02d}.pdf", 'wb') as f: f.write(conteudo)
+                    gerados += 1
+            else:
+                with open(f"{base}.pdf", 'wb') as f: f.write(gerar_pdf_analitico(df_emp, metricas, figuras, args.usuario))
+                gerados += 1
+        if 'xlsx' in args.formatos:
+            with open(f"{base}.xlsx", 'wb') as f: f.write(gerar_excel_personalizado(df_emp, "Dados Financeiros"))
+            gerados += 1
+        print(f"  {empresa}: {len(df_emp)} registros")
+
+    tempo_total = time.perf_counter() - inicio
+    print(f"Competências: {', '.join(competencias)} | {len(df_all)} registros carregados em {tempo_carga:,.2f}s")
+    print(f"Arquivos gerados: {gerados} em {tempo_total:,.2f}s ({len(df_all) / max(tempo_total, 1e-9):,.0f} registros/s)")
+    return 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Brasil Digital - Financeiro (modo sem interface)")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p_ing = sub.add_parser("ingerir", help="Processa um diretório de CSVs exportados e grava no MongoDB")
+    p_ing.add_argument("diretorio")
+    p_ing.add_argument("--workers", type=int, default=os.cpu_count())
+    p_ing.add_argument("--sem-salvar", action="store_true", help="Só processa e mede, sem gravar no banco")
+    p_ing.add_argument("--sem-cache", action="store_true", help="Ignora o cache de parse em disco (CACHE_PARSE_DIR)")
+    p_ing.set_defaults(func=comando_ingerir)
+
+    p_rel = sub.add_parser("relatorios", help="Gera PDF analítico e Excel por empresa")
+    p_rel.add_argument("saida")
+    p_rel.add_argument("--empresas", nargs="*")
+    p_rel.add_argument("--competencias", nargs="*")
+    p_rel.add_argument("--formatos", nargs="+", choices=["pdf", "xlsx"], default=["pdf", "xlsx"])
+    p_rel.add_argument("--usuario", default="Rotina Noturna")
+    p_rel.add_argument("--completo", action="store_true", help="PDF com todos os registros (não só os 50 primeiros)")
+    p_rel.add_argument("--agrupar", choices=["Area", "Competência"], help="Subtotais por grupo no detalhamento completo")
+    p_rel.add_argument("--linhas-por-parte", type=int, help="Linhas por arquivo PDF no detalhamento completo (padrão: relatorios.LINHAS_POR_PARTE)")
+    p_rel.set_defaults(func=comando_relatorios)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+
+# --- CUBO DE AGREGAÇÃO DO DASHBOARD ---
+# Uma única passada sobre os dados filtrados gera a tabela por colaborador dentro de cada
+# célula Area x Empresa x Competência x Categoria de evento. Ela funciona como o "esboço"
+# de colaboradores distintos de cada célula; KPIs, gráficos, alertas e a tabela
+# detalhada saem dela (ou das células) como fatias baratas.
+
+DIMENSOES = ['Area', 'Empresa', 'Competência', 'Cat']
+MEDIDAS = ['Valor (R$)', 'Horas Decimais']
+
+def categoria_evento(eventos):
+    texto = eventos.astype(str).str.upper()
+    return pd.Series(
+        np.select([texto.str.contains('60%', regex=False), texto.str.contains('DSR', regex=False)], ['60%', 'DSR'], 'OUTROS'),
+        index=eventos.index
+    )
+
+def calcular_cubo(df):
+    base = df[['ID Func', 'Nome', 'Cargo'] + DIMENSOES[:-1] + MEDIDAS].assign(Cat=categoria_evento(df['Tipo de Evento']))
+    funcionarios = base.groupby(DIMENSOES + ['ID Func', 'Nome', 'Cargo'], sort=False, dropna=False, observed=True)[MEDIDAS].sum().reset_index()
+
+    g_celulas = funcionarios.groupby(DIMENSOES, sort=False, dropna=False, observed=True)
+    celulas = g_celulas[MEDIDAS].sum()
+    celulas['Colaboradores'] = g_celulas['ID Func'].nunique()
+    return {"funcionarios": funcionarios, "celulas": celulas.reset_index()}
+
+def cubo_vazio(cubo):
+    return cubo['celulas'].empty
+
+def total_colaboradores(cubo):
+    return cubo['funcionarios']['ID Func'].nunique()
+
+def resumo_por(cubo, dimensao, medida='Valor (R$)'):
+    return cubo['celulas'].groupby(dimensao, sort=False)[medida].sum().reset_index()
+
+def horas_por_pessoa(cubo):
+    return cubo['funcionarios'].groupby(['Nome', 'Empresa', 'Area'])['Horas Decimais'].sum().reset_index()
+
+def pivot_eventos(cubo):
+    pivot = cubo['funcionarios'].pivot_table(
+        index=['ID Func', 'Nome', 'Cargo'], columns='Cat',
+        values=MEDIDAS, aggfunc='sum', fill_value=0
+    )
+    pivot.columns = [f'{c[0]}|{c[1]}' for c in pivot.columns]
+    pivot = pivot.reset_index()
+
+    for c in ['Horas Decimais|60%', 'Valor (R$)|60%', 'Horas Decimais|DSR', 'Valor (R$)|DSR']:
+        if c not in pivot.columns: pivot[c] = 0.0
+
+    cols_valor = [c for c in pivot.columns if 'Valor (R$)|' in c]
+    pivot['Total Geral (R$)'] = pivot[cols_valor].sum(axis=1)
+    return pivot
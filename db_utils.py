@@ -1,15 +1,29 @@
 import streamlit as st
 import pandas as pd
-import pymongo
-from pymongo import MongoClient, UpdateOne
 import bcrypt
-import certifi  # Importação obrigatória para corrigir o erro SSL
+import hashlib
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from cache_dados import CacheParticoes, CacheDisco
+
+# --- CONFIGURAÇÃO ---
+def ler_config(chave, padrao=None):
+    # Variáveis de ambiente têm prioridade (uso fora do Streamlit, ex.: cli.py); depois secrets.toml
+    valor = os.environ.get(chave)
+    if valor is not None: return valor
+    try: return st.secrets.get(chave, padrao)
+    except Exception: return padrao
 
 # --- CONEXÃO COM MONGODB ---
 @st.cache_resource
 def init_connection():
-    uri = st.secrets.get("MONGO_URI", "")
+    uri = ler_config("MONGO_URI", "")
     if not uri: return None
+
+    # pymongo/certifi só são carregados quando o cliente é criado de fato
+    from pymongo import MongoClient
+    import certifi  # Importação obrigatória para corrigir o erro SSL
     
     # tlsCAFile=certifi.where() é a "vacina" para o erro de SSL no Streamlit Cloud
     return MongoClient(uri, tlsCAFile=certifi.where())
@@ -102,8 +116,10 @@ def atualizar_dados_usuario(email_antigo, novo_nome, novo_email, novo_cargo, nov
 # --- FUNÇÕES FINANCEIRAS ---
 
 def salvar_dados_mongo(df):
+    from pymongo import UpdateOne
     db = get_db()
     if db is None: return 0
+    if usa_layout_buckets(): return _salvar_buckets(db, df)
     collection = db.folha_eventos
     operations = []
     
@@ -111,78 +127,476 @@ def salvar_dados_mongo(df):
     if 'Valor (R$)' not in df.columns: df['Valor (R$)'] = 0.0
     if 'Horas Decimais' not in df.columns: df['Horas Decimais'] = 0.0
 
-    for _, row in df.iterrows():
-        try:
-            comp_safe = str(row['Competência']).replace('/', '-')
-            evento_safe = "".join(c for c in str(row['Tipo de Evento']) if c.isalnum())
-            doc_id = f"{row['Empresa']}_{comp_safe}_{row['ID Func']}_{evento_safe}"
-            
-            # Converte para dicionário e trata tipos incompatíveis com Mongo (ex: float do numpy)
-            dados = row.to_dict()
-            dados['_id'] = doc_id
-            
-            operations.append(UpdateOne({'_id': doc_id}, {'$set': dados}, upsert=True))
-        except: continue
+    # IDs montados de forma vetorizada (mesmo formato de antes: Empresa_MM-AAAA_ID_Evento)
+    comp_safe = df['Competência'].map(str).str.replace('/', '-', regex=False)
+    evento_safe = df['Tipo de Evento'].map(str).str.replace(r'[\W_]+', '', regex=True)
+    doc_ids = df['Empresa'].map(str) + '_' + comp_safe + '_' + df['ID Func'].map(str) + '_' + evento_safe
+
+    # to_dict('records') já devolve tipos nativos do Python, compatíveis com o Mongo
+    for doc_id, dados in zip(doc_ids, df.to_dict('records')):
+        dados['_id'] = doc_id
+        operations.append(UpdateOne({'_id': doc_id}, {'$set': dados}, upsert=True))
 
     if operations:
         try:
             result = collection.bulk_write(operations)
-            return result.upserted_count + result.modified_count
         except: return 0
+        if not _registrar_versoes_ou_invalidar(db, df): return 0
+        return result.upserted_count + result.modified_count
     return 0
 
+# --- ARMAZENAMENTO EM BUCKETS (COLUNAR) ---
+# Layout opcional (LAYOUT_FOLHA = "buckets"): um documento por
+# (Empresa, Competência, Tipo de Evento, nº do bucket) com as demais colunas
+# em listas paralelas, em vez de um documento por funcionário x evento x mês.
+
+MAX_LINHAS_BUCKET = 5000
+CAMPOS_PARTICAO_BUCKET = ['Empresa', 'Competência', 'Tipo de Evento']
+
+def usa_layout_buckets():
+    return str(ler_config("LAYOUT_FOLHA", "documentos")).lower() == "buckets"
+
+def colecao_folha(db):
+    return db.folha_eventos_buckets if usa_layout_buckets() else db.folha_eventos
+
+def garantir_indices_buckets(db):
+    db.folha_eventos_buckets.create_index([("Empresa", 1), ("Competência", 1), ("Tipo de Evento", 1), ("bucket", 1)])
+
+def _id_bucket(empresa, competencia, evento, numero):
+    # O trecho legível do evento perde símbolos ("HE 60%" e "HE 60" ficariam iguais):
+    # o hash do nome original é o que mantém cada evento num documento próprio
+    comp_safe = str(competencia).replace('/', '-')
+    evento_safe = "".join(c for c in str(evento) if c.isalnum())
+    evento_hash = hashlib.sha1(str(evento).encode('utf-8')).hexdigest()[:10]
+    return f"{empresa}_{comp_safe}_{evento_safe}-{evento_hash}_{numero}"
+
+def _buckets_para_dataframe(docs):
+    # Cada bucket vira um DataFrame direto das listas de colunas, sem passar por linhas
+    partes = []
+    for doc in docs:
+        df_bucket = pd.DataFrame(doc.get('colunas', {}))
+        for campo in CAMPOS_PARTICAO_BUCKET: df_bucket[campo] = doc.get(campo)
+        partes.append(df_bucket)
+    if not partes: return pd.DataFrame()
+    return pd.concat(partes, ignore_index=True)
+
+# Gravações concorrentes (ex.: cli.py ingerir noturno e um upload pelo app) são
+# controladas de forma otimista: todos os buckets de um grupo carregam a mesma
+# "revisao", o bucket 0 só é substituído se ainda tiver a revisão lida e, em caso
+# de conflito, o grupo é relido e mesclado de novo.
+TENTATIVAS_BUCKET = 5
+
+def _ler_grupo_bucket(db, filtro):
+    # Revisões misturadas indicam outro gravador no meio da reescrita: espera e relê
+    for tentativa in range(TENTATIVAS_BUCKET):
+        docs = list(db.folha_eventos_buckets.find(filtro))
+        if len({d.get('revisao') for d in docs}) <= 1: break
+        time.sleep(0.05 * (tentativa + 1))
+    revisao = next((d.get('revisao') for d in docs if d.get('bucket') == 0), None)
+    return _buckets_para_dataframe(docs), revisao
+
+def _gravar_grupo_bucket(db, emp, comp, evento, novos):
+    from pymongo import ReplaceOne, DeleteMany
+    from pymongo.errors import DuplicateKeyError
+    filtro = {"Empresa": emp, "Competência": comp, "Tipo de Evento": evento}
+
+    for _ in range(TENTATIVAS_BUCKET):
+        # Mescla com o que já existe: a chave da linha continua sendo o ID Func
+        existentes, revisao = _ler_grupo_bucket(db, filtro)
+        linhas = pd.concat([existentes, novos], ignore_index=True) if not existentes.empty else novos
+        linhas = linhas.drop_duplicates(subset=['ID Func'], keep='last').reset_index(drop=True)
+        colunas = [c for c in linhas.columns if c not in CAMPOS_PARTICAO_BUCKET]
+
+        nova_revisao = (revisao or 0) + 1
+        docs = []
+        for numero, inicio in enumerate(range(0, len(linhas), MAX_LINHAS_BUCKET)):
+            fatia = linhas.iloc[inicio:inicio + MAX_LINHAS_BUCKET]
+            doc_id = _id_bucket(emp, comp, evento, numero)
+            docs.append({
+                '_id': doc_id, 'Empresa': emp, 'Competência': comp, 'Tipo de Evento': evento,
+                'bucket': numero, 'qtd': len(fatia), 'revisao': nova_revisao,
+                'colunas': {c: fatia[c].tolist() for c in colunas}
+            })
+
+        # Troca condicional do bucket 0: se outro gravador já mudou a revisão, o filtro
+        # não casa, o upsert tenta inserir o mesmo _id e o Mongo recusa (DuplicateKeyError)
+        condicao = revisao if revisao is not None else {"$exists": False}
+        try: db.folha_eventos_buckets.replace_one({'_id': docs[0]['_id'], 'revisao': condicao}, docs[0], upsert=True)
+        except DuplicateKeyError: continue
+
+        operations = [ReplaceOne({'_id': d['_id']}, d, upsert=True) for d in docs[1:]]
+        # Remove buckets que sobraram da gravação anterior (inclusive com _id no formato antigo)
+        operations.append(DeleteMany({**filtro, "_id": {"$nin": [d['_id'] for d in docs]}}))
+        db.folha_eventos_buckets.bulk_write(operations, ordered=True)
+        return True
+    return False
+
+def _salvar_buckets(db, df):
+    if df.empty: return 0
+    df = df.copy()
+    if 'Valor (R$)' not in df.columns: df['Valor (R$)'] = 0.0
+    if 'Horas Decimais' not in df.columns: df['Horas Decimais'] = 0.0
+    if '_id' in df.columns: df = df.drop(columns=['_id'])
+
+    total_linhas = 0
+    gravou_algo = False
+    falhou = False
+    for (emp, comp, evento), novos in df.groupby(CAMPOS_PARTICAO_BUCKET, sort=False, dropna=False):
+        try:
+            if _gravar_grupo_bucket(db, emp, comp, evento, novos):
+                gravou_algo = True
+                total_linhas += len(novos)
+                continue
+            print(f"Buckets de {emp} {comp} {evento} não gravados: conflito com outra gravação em todas as tentativas.")
+        except Exception as e: print(f"Erro ao gravar buckets de {emp} {comp} {evento}: {e}")
+        falhou = True
+
+    if not gravou_algo: return 0
+    # Os buckets já foram gravados: a versão sobe antes de qualquer etapa derivada,
+    # para que uma falha no índice ou no resumo não deixe os caches servindo dados antigos
+    versao_ok = _registrar_versoes_ou_invalidar(db, df)
+    try: garantir_indices_buckets(db)
+    except Exception as e: print(f"Erro ao criar o índice de folha_eventos_buckets: {e}")
+    try: atualizar_resumo_funcionarios(db, df)
+    except Exception as e:
+        print(f"Erro ao atualizar o resumo por colaborador (rode migrar_buckets.py --resumo): {e}")
+    if not versao_ok or falhou: return 0
+    return total_linhas
+
+def migrar_folha_para_buckets(empresas=None, progresso=None):
+    # Copia folha_eventos para folha_eventos_buckets, uma partição Empresa x Competência por vez.
+    # A coleção original não é alterada; troque LAYOUT_FOLHA para "buckets" após conferir.
+    db = get_db()
+    if db is None: return 0
+    filtro = {"Empresa": {"$in": list(empresas)}} if empresas else {}
+    pares = db.folha_eventos.aggregate([
+        {"$match": filtro},
+        {"$group": {"_id": {"Empresa": "$Empresa", "Competência": "$Competência"}}}
+    ])
+    pares = sorted((p['_id']['Empresa'], p['_id']['Competência']) for p in pares)
+
+    total = 0
+    for i, (emp, comp) in enumerate(pares):
+        df = pd.DataFrame(list(db.folha_eventos.find({"Empresa": emp, "Competência": comp}, {"_id": 0})))
+        if not df.empty: total += _salvar_buckets(db, df)
+        if progresso: progresso(i + 1, len(pares), emp, comp)
+    return total
+
+# --- VERSÕES E CACHE DE PARTIÇÕES (Empresa x Competência) ---
+
+@st.cache_resource
+def obter_cache_compartilhado():
+    limite_mb = float(ler_config("CACHE_MEMORIA_MB", 1024))
+    return CacheParticoes(int(limite_mb * 1024 * 1024))
+
+@st.cache_resource
+def obter_cache_disco():
+    diretorio = ler_config("CACHE_DIR", ".cache_particoes")
+    limite_mb = float(ler_config("CACHE_DISCO_MB", 4096))
+    try: return CacheDisco(diretorio, int(limite_mb * 1024 * 1024))
+    except OSError: return None
+
+@st.cache_resource
+def obter_cache_parse():
+    # Resultados do parser de CSV por digest do conteúdo (ver processamento.processar_com_cache)
+    diretorio = ler_config("CACHE_PARSE_DIR", ".cache_parse")
+    limite_mb = float(ler_config("CACHE_PARSE_MB", 1024))
+    try: return CacheDisco(diretorio, int(limite_mb * 1024 * 1024))
+    except OSError: return None
+
+def _chave_versao(empresa, competencia):
+    return f"{empresa}|{competencia}"
+
+def registrar_versoes_particoes(db, df):
+    from pymongo import UpdateOne
+    # Cada gravação incrementa a versão das partições tocadas, invalidando os caches
+    pares = df[['Empresa', 'Competência']].drop_duplicates()
+    operations = [
+        UpdateOne(
+            {'_id': _chave_versao(emp, comp)},
+            {'$set': {'Empresa': emp, 'Competência': comp}, '$inc': {'versao': 1}},
+            upsert=True
+        )
+        for emp, comp in pares.itertuples(index=False)
+    ]
+    if operations: db.versoes_particoes.bulk_write(operations)
+
+def _registrar_versoes_ou_invalidar(db, df):
+    # Os dados já foram gravados: sem o incremento de versão os caches (inclusive o de
+    # disco, que sobrevive a reinícios) continuariam servindo a versão antiga.
+    # A falha é reportada ao chamador (retorno 0) e os caches locais são descartados.
+    try:
+        registrar_versoes_particoes(db, df)
+        return True
+    except Exception as e:
+        print(f"Erro ao registrar versões das partições: {e}")
+        obter_cache_compartilhado().limpar()
+        disco = obter_cache_disco()
+        if disco is not None: disco.limpar()
+        return False
+
+def carregar_versoes_particoes(db, empresas_sel, competencias_sel):
+    query = {"Empresa": {"$in": list(empresas_sel)}, "Competência": {"$in": list(competencias_sel)}}
+    cursor = db.versoes_particoes.find(query, {"Empresa": 1, "Competência": 1, "versao": 1})
+    return {(d['Empresa'], d['Competência']): d.get('versao', 0) for d in cursor}
+
 @st.cache_data(ttl=600)
 def carregar_filtros_mongo():
     db = get_db()
     if db is None: return [], []
     try:
-        empresas = db.folha_eventos.distinct("Empresa")
-        competencias = db.folha_eventos.distinct("Competência")
+        colecao = colecao_folha(db)
+        empresas = colecao.distinct("Empresa")
+        competencias = colecao.distinct("Competência")
         return sorted(empresas), sorted(competencias)
     except: return [], []
 
-@st.cache_data(ttl=600)
+@st.cache_resource
+def garantir_indices_particoes():
+    # Toda busca filtra por Empresa + Competência: sem este índice cada partição
+    # (e cada thread do modo paralelo) faria a própria varredura da coleção
+    db = get_db()
+    if db is None: return False
+    try:
+        if usa_layout_buckets(): garantir_indices_buckets(db)
+        else: db.folha_eventos.create_index([("Empresa", 1), ("Competência", 1)])
+        return True
+    except: return False
+
+def _buscar_particao_mongo(db, empresa, competencia, batch_size):
+    query = {"Empresa": empresa, "Competência": competencia}
+    if usa_layout_buckets():
+        return _buckets_para_dataframe(db.folha_eventos_buckets.find(query, {"_id": 0}, batch_size=batch_size))
+    return pd.DataFrame(list(db.folha_eventos.find(query, {"_id": 0}, batch_size=batch_size)))
+
+def buscar_particoes_mongo(db, pares, paralelo=None):
+    # Busca apenas as partições pedidas e devolve {(Empresa, Competência): DataFrame}.
+    # Com paralelo > 1 cada partição vira um cursor próprio num pool de threads,
+    # aproveitando o pool de conexões do MongoClient; com paralelo = 1 usa um único cursor.
+    if not pares: return {}
+    if paralelo is None: paralelo = int(ler_config("MONGO_MAX_PARALELO", 8))
+    batch_size = int(ler_config("MONGO_BATCH_SIZE", 5000))
+    garantir_indices_particoes()
+
+    if paralelo > 1 and len(pares) > 1:
+        with ThreadPoolExecutor(max_workers=min(paralelo, len(pares))) as executor:
+            resultados = executor.map(lambda p: _buscar_particao_mongo(db, p[0], p[1], batch_size), pares)
+            return {par: df for par, df in zip(pares, resultados) if not df.empty}
+
+    query = {"$or": [{"Empresa": emp, "Competência": comp} for emp, comp in pares]}
+    if usa_layout_buckets():
+        df_novo = _buckets_para_dataframe(db.folha_eventos_buckets.find(query, {"_id": 0}, batch_size=batch_size))
+    else:
+        cursor = db.folha_eventos.find(query, {"_id": 0}, batch_size=batch_size)
+        df_novo = pd.DataFrame(list(cursor))
+    if df_novo.empty: return {}
+    return {k: g.reset_index(drop=True) for k, g in df_novo.groupby(['Empresa', 'Competência'], sort=False)}
+
 def carregar_dados_mongo(empresas_sel, competencias_sel):
     db = get_db()
     if db is None: return pd.DataFrame()
     if not empresas_sel or not competencias_sel: return pd.DataFrame()
+
+    # Seleção normalizada: reordenar ou repetir itens não muda a chave do cache
+    empresas_sel = sorted(set(empresas_sel))
+    competencias_sel = sorted(set(competencias_sel))
     
+    # Cache único do processo: sessões com a mesma seleção recebem o mesmo objeto
+    cache = obter_cache_compartilhado()
     try:
-        query = {"Empresa": {"$in": empresas_sel}, "Competência": {"$in": competencias_sel}}
-        cursor = db.folha_eventos.find(query)
-        df = pd.DataFrame(list(cursor))
-        if not df.empty and '_id' in df.columns: df = df.drop(columns=['_id'])
+        versoes = carregar_versoes_particoes(db, empresas_sel, competencias_sel)
+        chaves = [(e, c, versoes.get((e, c), 0)) for e in empresas_sel for c in competencias_sel]
+        chave_selecao = ('selecao',) + tuple(chaves)
+
+        df = cache.obter(chave_selecao)
+        if df is not None: return df
+
+        partes = [cache.obter(('particao',) + k) for k in chaves]
+
+        # Falhas na memória tentam o cache em disco antes de ir ao MongoDB
+        disco = obter_cache_disco()
+        if disco is not None:
+            for i, k in enumerate(chaves):
+                if partes[i] is not None: continue
+                df_disco = disco.obter(_chave_versao(k[0], k[1]), k[2])
+                if df_disco is not None: partes[i] = cache.guardar(('particao',) + k, df_disco)
+
+        # Só o delta (partições ausentes em ambos os caches) vai ao banco
+        faltantes = [k for k, p in zip(chaves, partes) if p is None]
+        if faltantes:
+            grupos = buscar_particoes_mongo(db, [k[:2] for k in faltantes])
+            for i, k in enumerate(chaves):
+                if partes[i] is not None: continue
+                df_part = grupos.get(k[:2], pd.DataFrame())
+                if disco is not None: disco.guardar(_chave_versao(k[0], k[1]), df_part, k[2])
+                partes[i] = cache.guardar(('particao',) + k, df_part)
+
+        partes = [p for p in partes if not p.empty]
+        if not partes: return pd.DataFrame()
+        # Uma única concatenação monta a seleção a partir das partições compartilhadas.
+        # Com uma partição só, seleção e partição são o mesmo objeto (contado uma vez no
+        # orçamento); com várias, a cópia concatenada entra no orçamento e a LRU despeja
+        # as partições menos usadas quando a memória aperta.
+        df = partes[0] if len(partes) == 1 else pd.concat(partes, ignore_index=True)
+        df = cache.guardar(chave_selecao, df)
+        # Identifica o conteúdo carregado para caches derivados (ex.: anomalias)
+        df.attrs['versao_dados'] = hashlib.sha1(repr(chave_selecao).encode('utf-8')).hexdigest()
         return df
     except: return pd.DataFrame()
 
+# --- HISTÓRICO POR COLABORADOR ---
+
+# No layout em buckets um índice em "colunas.ID Func" teria uma entrada por linha
+# (multikey) e cada consulta traria buckets inteiros de 5000 linhas. Em vez disso é
+# mantido um resumo por colaborador: um documento por (Empresa, ID Func) com as horas
+# e valores de cada competência x evento, atualizado a cada gravação.
+
+def _id_resumo(empresa, id_func):
+    return f"{empresa}_{id_func}"
+
+def _chave_historico(competencia, evento):
+    # Vira nome de campo: sem "." nem "$"; o hash separa eventos que só diferem em símbolos
+    comp_safe = str(competencia).replace('/', '-')
+    evento_hash = hashlib.sha1(str(evento).encode('utf-8')).hexdigest()[:10]
+    return f"{comp_safe}_{evento_hash}"
+
+def atualizar_resumo_funcionarios(db, df):
+    from pymongo import UpdateOne
+    if df.empty: return 0
+    base = df.drop_duplicates(subset=['Empresa', 'Competência', 'Tipo de Evento', 'ID Func'], keep='last')
+    for col in ['Nome', 'Cargo']:
+        if col not in base.columns: base = base.assign(**{col: ''})
+    chaves = [_chave_historico(comp, evento) for comp, evento in zip(base['Competência'], base['Tipo de Evento'])]
+
+    alteracoes = {}
+    registros = base[['Empresa', 'ID Func', 'Nome', 'Cargo', 'Competência', 'Tipo de Evento', 'Horas Decimais', 'Valor (R$)']].to_dict('records')
+    for chave, r in zip(chaves, registros):
+        doc = alteracoes.setdefault((r['Empresa'], r['ID Func']), {'Empresa': r['Empresa'], 'ID Func': r['ID Func']})
+        doc['Nome'], doc['Cargo'] = r['Nome'], r['Cargo']
+        doc[f'historico.{chave}'] = {k: r[k] for k in ['Competência', 'Tipo de Evento', 'Nome', 'Cargo', 'Horas Decimais', 'Valor (R$)']}
+
+    operations = [UpdateOne({'_id': _id_resumo(emp, id_func)}, {'$set': campos}, upsert=True) for (emp, id_func), campos in alteracoes.items()]
+    db.resumo_funcionarios.bulk_write(operations, ordered=False)
+    return len(operations)
+
+def reconstruir_resumo_funcionarios(progresso=None):
+    # Para coleções em buckets gravadas antes do resumo existir
+    db = get_db()
+    if db is None: return 0
+    pares = db.folha_eventos_buckets.aggregate([{"$group": {"_id": {"Empresa": "$Empresa", "Competência": "$Competência"}}}])
+    pares = sorted((p['_id']['Empresa'], p['_id']['Competência']) for p in pares)
+
+    # Reconstrução completa: descarta entradas antigas (ex.: chaves de histórico de outro formato)
+    db.resumo_funcionarios.delete_many({})
+    total = 0
+    for i, (emp, comp) in enumerate(pares):
+        df = _buckets_para_dataframe(db.folha_eventos_buckets.find({"Empresa": emp, "Competência": comp}, {"_id": 0}))
+        if not df.empty: total += atualizar_resumo_funcionarios(db, df)
+        if progresso: progresso(i + 1, len(pares), emp, comp)
+    return total
+
+@st.cache_resource
+def garantir_indices_folha():
+    # Só o índice do layout ativo: (ID Func, Empresa, Competência) na coleção por documento
+    # ou (ID Func, Empresa) no resumo por colaborador do layout em buckets
+    db = get_db()
+    if db is None: return False
+    try:
+        if usa_layout_buckets(): db.resumo_funcionarios.create_index([("ID Func", 1), ("Empresa", 1)])
+        else: db.folha_eventos.create_index([("ID Func", 1), ("Empresa", 1), ("Competência", 1)])
+        return True
+    except: return False
+
+@st.cache_data(ttl=600, show_spinner=False)
+def carregar_historico_funcionario(id_func, empresa=None):
+    colunas = ['Empresa', 'Competência', 'Tipo de Evento', 'Nome', 'Cargo', 'Horas Decimais', 'Valor (R$)']
+    db = get_db()
+    if db is None: return pd.DataFrame(columns=colunas)
+    garantir_indices_folha()
+
+    try:
+        if usa_layout_buckets():
+            query = {"ID Func": id_func}
+            if empresa: query["Empresa"] = empresa
+            # Um documento por empresa do colaborador, já com uma linha por competência x evento
+            linhas = [
+                {'Empresa': doc['Empresa'], **item}
+                for doc in db.resumo_funcionarios.find(query, {"Empresa": 1, "historico": 1})
+                for item in doc.get('historico', {}).values()
+            ]
+            df = pd.DataFrame(linhas, columns=colunas)
+        else:
+            match = {"ID Func": id_func}
+            if empresa: match["Empresa"] = empresa
+            # Agregação no servidor: só volta uma linha por competência x evento
+            cursor = db.folha_eventos.aggregate([
+                {"$match": match},
+                {"$group": {
+                    "_id": {"Empresa": "$Empresa", "Competência": "$Competência", "Tipo de Evento": "$Tipo de Evento"},
+                    "Nome": {"$first": "$Nome"},
+                    "Cargo": {"$first": "$Cargo"},
+                    "Horas Decimais": {"$sum": "$Horas Decimais"},
+                    "Valor (R$)": {"$sum": "$Valor (R$)"}
+                }}
+            ])
+            linhas = [{**d['_id'], **{k: v for k, v in d.items() if k != '_id'}} for d in cursor]
+            df = pd.DataFrame(linhas, columns=colunas)
+
+        df['Data_Ord'] = pd.to_datetime(df['Competência'], format='%m/%Y', errors='coerce')
+        return df.sort_values(['Data_Ord', 'Tipo de Evento']).drop(columns=['Data_Ord']).reset_index(drop=True)[colunas]
+    except: return pd.DataFrame(columns=colunas)
+
 # --- CONFIGURAÇÕES ---
+# Cada mapeamento fica numa coleção própria, um documento por chave (Cargo ou Nome),
+# em vez de um único documento em "parametros": cresce sem esbarrar no limite de 16 MB
+# e cada gravação só toca as chaves alteradas, então dois admins não se sobrescrevem.
+# O documento antigo em "parametros" é migrado na primeira leitura.
+
+def _carregar_mapa(db, nome_colecao, id_legado):
+    colecao = db[nome_colecao]
+    mapa = {d['_id']: d.get('area', '') for d in colecao.find({}, {'area': 1})}
+    if mapa: return mapa
 
+    doc = db.parametros.find_one({"_id": id_legado})
+    if not doc or doc.get('migrado'): return {}
+    legado = doc.get('mapa', {})
+    if legado: _aplicar_alteracoes_mapa(db, nome_colecao, legado, [])
+    db.parametros.update_one({"_id": id_legado}, {"$set": {"migrado": True}})
+    return legado
+
+def _aplicar_alteracoes_mapa(db, nome_colecao, alterados, removidos):
+    from pymongo import UpdateOne, DeleteOne
+    operations = [UpdateOne({'_id': chave}, {'$set': {'area': area}}, upsert=True) for chave, area in alterados.items()]
+    operations += [DeleteOne({'_id': chave}) for chave in removidos if chave not in alterados]
+    if operations: db[nome_colecao].bulk_write(operations, ordered=False)
+    return len(operations)
+
+@st.cache_data(ttl=60, show_spinner=False)
 def carregar_mapa_cargos_mongo():
     db = get_db()
     if db is None: return {}
-    try:
-        doc = db.parametros.find_one({"_id": "mapeamento_areas"})
-        return doc.get('mapa', {}) if doc else {}
+    try: return _carregar_mapa(db, "mapeamento_areas", "mapeamento_areas")
     except: return {}
 
-def salvar_mapa_cargos_mongo(novo_mapa):
+def salvar_alteracoes_mapa_cargos(alterados, removidos):
     db = get_db()
-    if db is None: return
-    try:
-        db.parametros.update_one({"_id": "mapeamento_areas"}, {"$set": {"mapa": novo_mapa}}, upsert=True)
-    except: pass
+    if db is None: return 0
+    try: total = _aplicar_alteracoes_mapa(db, "mapeamento_areas", alterados, removidos)
+    except: return 0
+    carregar_mapa_cargos_mongo.clear()
+    return total
 
+@st.cache_data(ttl=60, show_spinner=False)
 def carregar_mapa_excecoes_mongo():
     db = get_db()
     if db is None: return {}
-    try:
-        doc = db.parametros.find_one({"_id": "mapeamento_excecoes"})
-        return doc.get('mapa', {}) if doc else {}
+    try: return _carregar_mapa(db, "mapeamento_excecoes", "mapeamento_excecoes")
     except: return {}
 
-def salvar_mapa_excecoes_mongo(novo_mapa):
+def salvar_alteracoes_mapa_excecoes(alterados, removidos):
     db = get_db()
-    if db is None: return
-    try:
-        db.parametros.update_one({"_id": "mapeamento_excecoes"}, {"$set": {"mapa": novo_mapa}}, upsert=True)
-    except: pass
+    if db is None: return 0
+    try: total = _aplicar_alteracoes_mapa(db, "mapeamento_excecoes", alterados, removidos)
+    except: return 0
+    carregar_mapa_excecoes_mongo.clear()
+    return total
@@ -0,0 +1,75 @@
+import pandas as pd
+from cubo import resumo_por, total_colaboradores
+
+# --- KPIs E GRÁFICOS DO DASHBOARD ---
+# Compartilhados entre o app.py e o cli.py (relatórios sem interface); KPIs e gráficos
+# principais são fatias do cubo de agregação (cubo.py).
+# O plotly é importado dentro das funções: só carrega quando o primeiro gráfico é montado.
+
+def metricas_dashboard(cubo):
+    celulas = cubo['celulas']
+    total_custo = celulas['Valor (R$)'].sum()
+    total_horas = celulas['Horas Decimais'].sum()
+    qtd_colab = total_colaboradores(cubo)
+    media = total_custo / qtd_colab if qtd_colab else 0
+    return total_custo, total_horas, qtd_colab, media
+
+def metricas_exportacao(total_custo, total_horas, qtd_colab, media):
+    return {
+        "Custo Total": f"R$ {total_custo:,.2f}",
+        "Horas Totais": f"{total_horas:,.1f}",
+        "Colaboradores": str(qtd_colab),
+        "Ticket Medio": f"R$ {media:,.2f}"
+    }
+
+def figuras_dashboard(cubo):
+    import plotly.express as px
+    fig_area = px.bar(
+        resumo_por(cubo, 'Area').sort_values('Valor (R$)'), 
+        x='Valor (R$)', y='Area', orientation='h', title="Custo por Área",
+        color_discrete_sequence=['#002776']
+    )
+    
+    fig_emp = px.pie(
+        resumo_por(cubo, 'Empresa'), 
+        values='Valor (R$)', names='Empresa', title="Custo por Empresa",
+        color_discrete_sequence=px.colors.sequential.Blues_r
+    )
+
+    df_line = resumo_por(cubo, 'Competência')
+    try:
+        df_line['Data_Ord'] = pd.to_datetime(df_line['Competência'], format='%m/%Y', errors='coerce')
+        df_line = df_line.sort_values('Data_Ord')
+    except: pass 
+    
+    fig_line = px.line(
+        df_line, x='Competência', y='Valor (R$)', markers=True, 
+        title="Evolução Mensal (Custo Total)",
+        color_discrete_sequence=['#009639']
+    )
+    fig_line.update_layout(xaxis=dict(type='category'))
+    return fig_area, fig_emp, fig_line
+
+def figuras_cenarios(total_pagar, total_dias, mcash, mfolga):
+    import plotly.express as px
+    proj_cash = pd.DataFrame({
+        'Mês': [f'Mês {i+1}' for i in range(int(mcash))],
+        'Valor (R$)': [total_pagar/mcash] * int(mcash)
+    })
+    fig_proj1 = px.bar(proj_cash, x='Mês', y='Valor (R$)', text_auto='.2s', title=f"Desembolso de Pagamento em {int(mcash)}x", color_discrete_sequence=['#002776'])
+
+    proj_folga = pd.DataFrame({
+        'Mês': [f'Mês {i+1}' for i in range(int(mfolga))],
+        'Dias Off da Equipe': [total_dias/mfolga] * int(mfolga)
+    })
+    fig_proj2 = px.bar(proj_folga, x='Mês', y='Dias Off da Equipe', text_auto='.1f', title=f"Diluição de Folgas em {int(mfolga)} meses", color_discrete_sequence=['#009639'])
+    return fig_proj1, fig_proj2
+
+def figura_historico(mensal):
+    import plotly.express as px
+    fig_hist = px.bar(
+        mensal, x='Competência', y='Horas Decimais', title="Horas por Competência",
+        hover_data={'Valor (R$)': ':,.2f'}, color_discrete_sequence=['#002776']
+    )
+    fig_hist.update_layout(xaxis=dict(type='category'))
+    return fig_hist
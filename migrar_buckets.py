@@ -0,0 +1,19 @@
+import sys
+from db_utils import migrar_folha_para_buckets, reconstruir_resumo_funcionarios
+
+# Uso: python migrar_buckets.py [Empresa ...]
+#      python migrar_buckets.py --resumo
+# Lê MONGO_URI de .streamlit/secrets.toml e copia folha_eventos para o layout em buckets.
+# --resumo só reconstrói o resumo por colaborador (histórico) a partir dos buckets existentes.
+
+def mostrar_progresso(atual, total, empresa, competencia):
+    print(f"[{atual}/{total}] {empresa} - {competencia}")
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["--resumo"]:
+        total = reconstruir_resumo_funcionarios(progresso=mostrar_progresso)
+        print(f"{total} atualizações gravadas em resumo_funcionarios.")
+        sys.exit(0)
+    empresas = sys.argv[1:] or None
+    total = migrar_folha_para_buckets(empresas, progresso=mostrar_progresso)
+    print(f"{total} registros migrados para folha_eventos_buckets.")
@@ -0,0 +1,207 @@
+import io
+import os
+import gzip
+import hashlib
+import zipfile
+import tarfile
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import pandas as pd
+
+# --- PARSER DOS RELATÓRIOS DE EVENTOS (CSV) ---
+# Funções puras, sem Streamlit: usadas pelo app.py (com st.cache_data por cima) e pelo cli.py.
+
+# Incrementar sempre que o resultado do parser mudar: invalida o cache de parse em disco
+VERSAO_PARSER = "1"
+
+@lru_cache(maxsize=65536)
+def converter_valor_monetario(valor_str):
+    if pd.isna(valor_str): return 0.0
+    try:
+        limpo = str(valor_str).replace('.', '').replace(',', '.')
+        return float(limpo)
+    except: return 0.0
+
+@lru_cache(maxsize=65536)
+def converter_horas(hora_str):
+    if pd.isna(hora_str): return 0.0
+    try:
+        limpo = str(hora_str).lower().replace('hs', '').strip()
+        partes = limpo.split(':')
+        return int(partes[0]) + (int(partes[1]) / 60)
+    except: return 0.0
+
+def formatar_horas_decimal_para_str(horas_decimal):
+    try:
+        horas = int(horas_decimal)
+        minutos = int((horas_decimal - horas) * 60)
+        return f"{horas:02d}:{minutos:02d}"
+    except: return "00:00"
+
+def extrair_metadados(linhas):
+    empresa = "Empresa Desconhecida"
+    competencia = "N/A"
+    for linha in linhas[:20]:
+        linha = linha.strip()
+        if " - " in linha and ";" in linha and ("Pág:" in linha or "Pag:" in linha):
+            partes = linha.split(';')
+            if len(partes) > 0:
+                raw_emp = partes[0].replace('"', '').strip()
+                empresa = raw_emp.split(" - ", 1)[1] if " - " in raw_emp else raw_emp
+        if "Período:" in linha:
+            try: competencia = linha.split(':')[1].split('à')[0].replace('"', '').strip()
+            except: pass
+    return empresa, competencia
+
+def processar_csv_financeiro(file_content, file_name):
+    try: decoded = file_content.decode("utf-8")
+    except UnicodeDecodeError: decoded = file_content.decode("latin-1")
+    
+    stringio = io.StringIO(decoded)
+    linhas = stringio.readlines()
+    empresa_atual, competencia_atual = extrair_metadados(linhas)
+    
+    dados = []
+    evento_atual = None
+    
+    for linha in linhas:
+        linha_clean = linha.strip()
+        if not linha_clean or linha_clean.startswith('_') or "Total" in linha_clean: continue
+        
+        if linha_clean.startswith('"Evento:') or linha_clean.startswith('Evento:'):
+            evento_atual = linha_clean.replace('"Evento:', '').replace('Evento:', '').replace('"', '').strip()
+            continue
+            
+        partes = linha_clean.split(';')
+        if len(partes) >= 6 and partes[0].replace('"', '').strip().isdigit():
+            try:
+                cargo_nome = partes[-4].replace('"', '').strip()
+                if cargo_nome.replace('.', '').isdigit(): cargo_nome = partes[2].replace('"', '').strip()
+
+                dados.append({
+                    'Empresa': empresa_atual,
+                    'Competência': competencia_atual,
+                    'ID Func': partes[0].replace('"', '').strip(),
+                    'Nome': partes[1].replace('"', '').strip(),
+                    'Cargo': cargo_nome,
+                    'Referência Original': partes[-2].replace('"', '').strip(),
+                    'Horas Decimais': converter_horas(partes[-2].replace('"', '').strip()),
+                    'Valor (R$)': converter_valor_monetario(partes[-1].replace('"', '').strip()),
+                    'Tipo de Evento': evento_atual,
+                    'Arquivo': file_name
+                })
+            except: continue
+    return pd.DataFrame(dados)
+
+def aplicar_areas_otimizado(df, mapa_cargos, mapa_excecoes):
+    if df.empty: return df
+    df_out = df.copy()
+    if 'Cargo' not in df_out.columns: df_out['Cargo'] = ''
+    if 'Nome' not in df_out.columns: df_out['Nome'] = ''
+
+    df_out['Area'] = df_out['Cargo'].map(mapa_cargos)
+    excecoes_series = df_out['Nome'].map(mapa_excecoes)
+    df_out['Area'] = excecoes_series.combine_first(df_out['Area'])
+    df_out['Area'] = df_out['Area'].fillna('Não Definido')
+    return df_out
+
+# --- ARQUIVOS COMPACTADOS (.zip / .gz / .tar.gz) ---
+EXTENSOES_COMPACTADAS = ('.zip', '.tar.gz', '.tgz', '.gz')
+
+def eh_compactado(nome):
+    return str(nome).lower().endswith(EXTENSOES_COMPACTADAS)
+
+def iterar_csvs(nome, arquivo):
+    # Gera (nome, bytes) de cada CSV, descompactando um membro por vez direto do arquivo aberto:
+    # o conteúdo descompactado do pacote inteiro nunca fica em memória de uma só vez.
+    nome_lower = str(nome).lower()
+    if nome_lower.endswith('.zip'):
+        with zipfile.ZipFile(arquivo) as zf:
+            for info in zf.infolist():
+                if info.is_dir() or not info.filename.lower().endswith('.csv'): continue
+                with zf.open(info) as membro:
+                    yield os.path.basename(info.filename), membro.read()
+    elif nome_lower.endswith(('.tar.gz', '.tgz')):
+        # Modo "r|gz": leitura sequencial em fluxo, sem buscar pelo arquivo
+        with tarfile.open(fileobj=arquivo, mode='r|gz') as tar:
+            for membro in tar:
+                if not membro.isfile() or not membro.name.lower().endswith('.csv'): continue
+                origem = tar.extractfile(membro)
+                if origem is not None: yield os.path.basename(membro.name), origem.read()
+    elif nome_lower.endswith('.gz'):
+        with gzip.GzipFile(fileobj=arquivo) as gz:
+            yield os.path.basename(str(nome)[:-3]), gz.read()
+    else:
+        yield os.path.basename(str(nome)), arquivo.read()
+
+def processar_em_paralelo(membros, processar=None, max_workers=4):
+    # Descompactação (zlib libera o GIL) e parse de membros diferentes se sobrepõem.
+    # No máximo 2 x max_workers membros ficam pendentes em memória ao mesmo tempo.
+    processar = processar or processar_csv_financeiro
+    resultados = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pendentes = {}
+        for indice, (nome, conteudo) in enumerate(membros):
+            pendentes[executor.submit(processar, conteudo, nome)] = indice
+            if len(pendentes) >= max_workers * 2:
+                feitos, _ = wait(pendentes, return_when=FIRST_COMPLETED)
+                for futuro in feitos: resultados[pendentes.pop(futuro)] = futuro.result()
+        for futuro in list(pendentes): resultados[pendentes.pop(futuro)] = futuro.result()
+    return [resultados[i] for i in sorted(resultados)]
+
+def processar_compactado(nome, arquivo, processar=None, max_workers=4):
+    dfs = [df for df in processar_em_paralelo(iterar_csvs(nome, arquivo), processar, max_workers) if not df.empty]
+    return pd.concat(dfs, ignore_index=True) if dfs else pd.DataFrame()
+
+# --- CACHE DE PARSE POR CONTEÚDO ---
+# O resultado do parser é guardado em disco (Arrow, via cache_dados.CacheDisco) sob o digest
+# do conteúdo + VERSAO_PARSER: o mesmo arquivo enviado de novo, em qualquer sessão ou
+# reinício, não é processado outra vez.
+TAMANHO_BLOCO_DIGEST = 1024 * 1024
+
+def digest_conteudo(arquivo):
+    h = hashlib.blake2b(digest_size=20)
+    if isinstance(arquivo, (bytes, bytearray, memoryview)):
+        h.update(arquivo)
+        return h.hexdigest()
+    arquivo.seek(0)
+    for bloco in iter(lambda: arquivo.read(TAMANHO_BLOCO_DIGEST), b''):
+        h.update(bloco)
+    arquivo.seek(0)
+    return h.hexdigest()
+
+def _chave_parse(digest):
+    return f"parse-v{VERSAO_PARSER}-{digest}"
+
+def processar_com_cache(cache, arquivo, nome, digest=None):
+    digest = digest or digest_conteudo(arquivo)
+    if cache is not None:
+        df = cache.obter(_chave_parse(digest))
+        if df is not None:
+            if not df.empty: df['Arquivo'] = nome
+            return df
+
+    if isinstance(arquivo, (bytes, bytearray, memoryview)):
+        conteudo = bytes(arquivo)
+    else:
+        arquivo.seek(0)
+        conteudo = arquivo.read()
+    df = processar_csv_financeiro(conteudo, nome)
+    if cache is not None: cache.guardar(_chave_parse(digest), df)
+    return df
+
+def processar_compactado_com_cache(cache, nome, arquivo, digest=None, max_workers=4):
+    # Pacote conhecido: devolve o resultado inteiro sem descompactar; senão cada CSV
+    # membro também passa pelo cache (membros repetidos entre pacotes não são reprocessados)
+    digest = digest or digest_conteudo(arquivo)
+    if cache is not None:
+        df = cache.obter(_chave_parse(digest))
+        if df is not None: return df
+
+    def processar(conteudo, nome_membro):
+        return processar_com_cache(cache, conteudo, nome_membro)
+
+    arquivo.seek(0)
+    df = processar_compactado(nome, arquivo, processar, max_workers)
+    if cache is not None: cache.guardar(_chave_parse(digest), df)
+    return df
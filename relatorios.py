@@ -1,45 +1,203 @@
-import streamlit as st
 import pandas as pd
 import io
-from fpdf import FPDF
 import datetime
 import tempfile
 import os
+import zipfile
+from functools import lru_cache
 
 # --- GERADOR DE PDF PRINCIPAL ---
-class PDFReport(FPDF):
-    def __init__(self, titulo, usuario):
-        super().__init__()
-        self.titulo = titulo
-        self.usuario = usuario
-        self.data_emissao = datetime.datetime.now().strftime("%d/%m/%Y %H:%M")
-
-    def header(self):
-        try:
-            self.image('logo-brasil-digital.png', 10, 8, 33)
-        except: pass
+# O fpdf só é importado na primeira geração de PDF (não pesa na abertura do app).
+@lru_cache(maxsize=None)
+def _classe_pdf():
+    from fpdf import FPDF
+
+    class PDFReport(FPDF):
+        def __init__(self, titulo, usuario):
+            super().__init__()
+            self.titulo = titulo
+            self.usuario = usuario
+            self.data_emissao = datetime.datetime.now().strftime("%d/%m/%Y %H:%M")
+
+        def header(self):
+            try:
+                self.image('logo-brasil-digital.png', 10, 8, 33)
+            except: pass
         
-        self.set_font('Arial', 'B', 15)
-        self.cell(80)
-        self.cell(30, 10, self.titulo, 0, 0, 'C')
-        self.ln(20)
+            self.set_font('Arial', 'B', 15)
+            self.cell(80)
+            self.cell(30, 10, self.titulo, 0, 0, 'C')
+            self.ln(20)
         
-        self.set_draw_color(0, 166, 81) # Verde Brasil Digital
-        self.set_line_width(1)
-        self.line(10, 25, 200, 25)
+            self.set_draw_color(0, 166, 81) # Verde Brasil Digital
+            self.set_line_width(1)
+            self.line(10, 25, 200, 25)
         
-        self.set_font('Arial', 'I', 8)
-        self.cell(0, 10, f'Gerado por: {self.usuario} | Em: {self.data_emissao}', 0, 1, 'R')
-        self.ln(5)
+            self.set_font('Arial', 'I', 8)
+            self.cell(0, 10, f'Gerado por: {self.usuario} | Em: {self.data_emissao}', 0, 1, 'R')
+            self.ln(5)
+
+        def footer(self):
+            self.set_y(-15)
+            self.set_font('Arial', 'I', 8)
+            self.cell(0, 10, f'Página {self.page_no()}', 0, 0, 'C')
+
+    return PDFReport
+
+def _novo_pdf(titulo, usuario):
+    return _classe_pdf()(titulo, usuario)
+
+# --- TABELA DETALHADA COMPLETA ---
+# Colunas: (coluna, largura, título, formato, alinhamento). Formato inteiro = corte do texto;
+# formato string = máscara numérica. Tudo é formatado por coluna antes de desenhar as linhas.
+COLUNAS_DETALHE_ANALITICO = [
+    ('Nome', 60, 'Nome', 35, 'L'),
+    ('Cargo', 50, 'Cargo', 30, 'L'),
+    ('Empresa', 50, 'Empresa', 25, 'L'),
+    ('Valor (R$)', 30, 'Valor (R$)', '{:,.2f}', 'R')
+]
+COLUNAS_DETALHE_CENARIOS = [
+    ('Nome', 60, 'Nome', 35, 'L'),
+    ('Empresa', 50, 'Empresa', 30, 'L'),
+    ('Pagar', 25, 'Pagar Total', 'R$ {:,.2f}', 'R'),
+    ('Mensal', 25, 'Mensalidade', 'R$ {:,.2f}', 'R'),
+    ('Dias', 20, 'Dias Off', '{:.1f}', 'C')
+]
+
+def _texto_latin1(serie):
+    # FPDF só aceita latin-1: caracteres fora dele viram "?" em vez de derrubar a linha
+    return serie.str.encode('latin-1', 'replace').str.decode('latin-1')
+
+def _preformatar_colunas(df, colunas):
+    textos = []
+    for col, _, _, fmt, _ in colunas:
+        serie = df[col] if col in df.columns else pd.Series('', index=df.index)
+        if isinstance(fmt, int):
+            textos.append(_texto_latin1(serie.fillna('').astype(str).str.slice(0, fmt)).tolist())
+        else:
+            textos.append(pd.to_numeric(serie, errors='coerce').fillna(0).map(fmt.format).tolist())
+    return textos
+
+def _cabecalho_tabela(pdf, colunas):
+    pdf.set_font('Arial', 'B', 7)
+    for _, largura, titulo, _, _ in colunas:
+        pdf.cell(largura, 7, titulo, 1, 0, 'C')
+    pdf.ln()
+    pdf.set_font('Arial', '', 7)
+
+def _escrever_linhas(pdf, colunas, textos, limite_y):
+    larguras = [c[1] for c in colunas]
+    alinhamentos = [c[4] for c in colunas]
+    for linha in zip(*textos):
+        if pdf.get_y() > limite_y:
+            pdf.add_page()
+            _cabecalho_tabela(pdf, colunas)
+        for largura, texto, alinhamento in zip(larguras, linha, alinhamentos):
+            pdf.cell(largura, 6, texto, 1, 0, alinhamento)
+        pdf.ln()
+
+def _cores_neutras(pdf):
+    # FPDF 1.7 repete os operadores de cor (q ... Q) em toda célula enquanto a cor de
+    # preenchimento difere da do texto; com as duas iguais as linhas saem sem esse custo
+    pdf.set_text_color(0)
+    pdf.set_fill_color(0)
+
+# --- DETALHAMENTO COMPLETO EM PARTES ---
+# O FPDF 1.7 guarda o documento inteiro em memória até output() e o monta por
+# concatenação de strings (custo que cresce mais que linearmente com o tamanho).
+# Por isso o detalhamento completo sai em partes de LINHAS_POR_PARTE linhas: cada
+# parte é um PDF próprio, gerado e liberado antes do seguinte, e a memória fica
+# limitada ao tamanho de uma parte. Num PDF único (detalhe_completo=True) o
+# documento inteiro fica em memória.
+LINHAS_POR_PARTE = 5000
 
-    def footer(self):
-        self.set_y(-15)
-        self.set_font('Arial', 'I', 8)
-        self.cell(0, 10, f'Página {self.page_no()}', 0, 0, 'C')
+def _ordenar_para_detalhe(df, agrupar_por):
+    if not agrupar_por or agrupar_por not in df.columns: return df.reset_index(drop=True)
+    # Linhas sem a chave de agrupamento também entram no relatório completo
+    chave = df[agrupar_por].astype(object).where(df[agrupar_por].notna(), '(vazio)')
+    return df.assign(**{agrupar_por: chave}).sort_values(agrupar_por, kind='stable').reset_index(drop=True)
+
+def _resumo_grupos(df, colunas, agrupar_por):
+    # Primeira/última posição, quantidade e somas de cada grupo sobre a tabela inteira,
+    # para que o subtotal de um grupo dividido entre partes considere todas as linhas
+    if not agrupar_por or agrupar_por not in df.columns: return None
+    numericas = [c[0] for c in colunas if not isinstance(c[3], int) and c[0] in df.columns]
+    posicoes = pd.Series(range(len(df)), index=df.index)
+    g = df.assign(_pos=posicoes).groupby(agrupar_por, sort=False)
+    resumo = g[numericas].sum() if numericas else pd.DataFrame(index=g.size().index)
+    resumo['_primeira'] = g['_pos'].min()
+    resumo['_ultima'] = g['_pos'].max()
+    resumo['_qtd'] = g.size()
+    return resumo
+
+def _escrever_tabela_completa(pdf, df, colunas, agrupar_por=None, grupos=None):
+    # df já ordenado por _ordenar_para_detalhe; o índice é a posição na tabela inteira
+    limite_y = pdf.h - 15 - 6
+    _cores_neutras(pdf)
+    _cabecalho_tabela(pdf, colunas)
+    if grupos is None:
+        _escrever_linhas(pdf, colunas, _preformatar_colunas(df, colunas), limite_y)
+        return
+
+    numericas = [c for c in grupos.columns if not c.startswith('_')]
+    for grupo, bloco in df.groupby(agrupar_por, sort=False):
+        info = grupos.loc[grupo]
+        if pdf.get_y() > limite_y - 7:
+            pdf.add_page()
+            _cabecalho_tabela(pdf, colunas)
+        continuacao = " - continuação" if bloco.index[0] > info['_primeira'] else ""
+        nome_grupo = _texto_latin1(pd.Series([f"{agrupar_por}: {grupo} ({int(info['_qtd'])} registros){continuacao}"])).iloc[0]
+        pdf.set_font('Arial', 'B', 7)
+        pdf.set_fill_color(230, 236, 245)
+        pdf.cell(sum(c[1] for c in colunas), 6, nome_grupo, 1, 1, 'L', True)
+        _cores_neutras(pdf)
+        pdf.set_font('Arial', '', 7)
+
+        _escrever_linhas(pdf, colunas, _preformatar_colunas(bloco, colunas), limite_y)
+
+        # O subtotal sai só na parte em que o grupo termina
+        if bloco.index[-1] != info['_ultima']: continue
+        linha_total = info[numericas].to_frame().T if numericas else pd.DataFrame(index=[0])
+        textos_total = _preformatar_colunas(linha_total, colunas)
+        pdf.set_font('Arial', 'B', 7)
+        for i, (col, largura, _, fmt, alinhamento) in enumerate(colunas):
+            texto = textos_total[i][0] if col in numericas else ('Subtotal' if i == 0 else '')
+            pdf.cell(largura, 6, texto, 1, 0, alinhamento)
+        pdf.ln()
+        pdf.set_font('Arial', '', 7)
+
+def _finalizar_pdf(pdf):
+    return pdf.output(dest='S').encode('latin-1')
+
+def _partes_detalhe(titulo, user_name, capa, titulo_tabela, df, colunas, agrupar_por, linhas_por_parte):
+    # Gera os bytes de cada parte; a capa (resumo e gráficos) só vai na primeira
+    df = _ordenar_para_detalhe(df, agrupar_por)
+    grupos = _resumo_grupos(df, colunas, agrupar_por)
+    tamanho = linhas_por_parte or max(len(df), 1)
+    total = max(1, -(-len(df) // tamanho))
+    for parte in range(total):
+        pdf = _novo_pdf(titulo, user_name)
+        if parte == 0: capa(pdf)
+        else: pdf.set_auto_page_break(auto=True, margin=15)
+        pdf.add_page()
+        pdf.set_font('Arial', 'B', 12)
+        pdf.set_text_color(0, 39, 118)
+        sufixo = f" - Parte {parte + 1}/{total}" if total > 1 else ""
+        pdf.cell(0, 10, f'{titulo_tabela} ({len(df)} Registros){sufixo}', 0, 1)
+        pdf.set_text_color(0, 0, 0)
+        _escrever_tabela_completa(pdf, df.iloc[parte * tamanho:(parte + 1) * tamanho], colunas, agrupar_por, grupos)
+        yield _finalizar_pdf(pdf)
+
+def compactar_partes_pdf(partes, nome_base):
+    # Junta as partes num .zip, uma por vez: só uma parte descompactada fica em memória
+    saida = io.BytesIO()
+    with zipfile.ZipFile(saida, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for i, conteudo in enumerate(partes, start=1):
+            zf.writestr(f"{nome_base}_parte{i:02d}.pdf", conteudo)
+    return saida.getvalue()
 
 # --- PDF: DASHBOARD ---
-def gerar_pdf_analitico(df, metrics, figures, user_name):
-    pdf = PDFReport("Relatório Financeiro", user_name)
+def _capa_analitico(pdf, metrics, figures):
     pdf.add_page()
     pdf.set_auto_page_break(auto=True, margin=15)
     
@@ -82,6 +240,18 @@ def gerar_pdf_analitico(df, metrics, figures, user_name):
         pdf.cell(0, 10, f"Erro ao gerar gráficos: {e}", 0, 1)
         pdf.set_text_color(0, 0, 0)
 
+def gerar_pdf_analitico_partes(df, metrics, figures, user_name, agrupar_por=None, linhas_por_parte=LINHAS_POR_PARTE):
+    return _partes_detalhe(
+        "Relatório Financeiro", user_name, lambda pdf: _capa_analitico(pdf, metrics, figures),
+        'Detalhamento Completo', df, COLUNAS_DETALHE_ANALITICO, agrupar_por, linhas_por_parte
+    )
+
+def gerar_pdf_analitico(df, metrics, figures, user_name, detalhe_completo=False, agrupar_por=None):
+    if detalhe_completo:
+        return next(gerar_pdf_analitico_partes(df, metrics, figures, user_name, agrupar_por, linhas_por_parte=None))
+    pdf = _novo_pdf("Relatório Financeiro", user_name)
+    _capa_analitico(pdf, metrics, figures)
+
     pdf.add_page()
     pdf.set_font('Arial', 'B', 12)
     pdf.set_text_color(0, 39, 118)
@@ -108,11 +278,10 @@ def gerar_pdf_analitico(df, metrics, figures, user_name):
             pdf.ln()
         except: pass
 
-    return pdf.output(dest='S').encode('latin-1')
+    return _finalizar_pdf(pdf)
 
 # --- PDF: CENÁRIOS / SIMULADOR ---
-def gerar_pdf_cenarios(df, metrics, figures, user_name):
-    pdf = PDFReport("Simulação de Cenários", user_name)
+def _capa_cenarios(pdf, metrics, figures):
     pdf.add_page()
     pdf.set_auto_page_break(auto=True, margin=15)
     
@@ -151,6 +320,18 @@ def gerar_pdf_cenarios(df, metrics, figures, user_name):
                     pdf.ln(5)
     except Exception as e: pass
 
+def gerar_pdf_cenarios_partes(df, metrics, figures, user_name, agrupar_por=None, linhas_por_parte=LINHAS_POR_PARTE):
+    return _partes_detalhe(
+        "Simulação de Cenários", user_name, lambda pdf: _capa_cenarios(pdf, metrics, figures),
+        'Colaboradores Afetados', df, COLUNAS_DETALHE_CENARIOS, agrupar_por, linhas_por_parte
+    )
+
+def gerar_pdf_cenarios(df, metrics, figures, user_name, detalhe_completo=False, agrupar_por=None):
+    if detalhe_completo:
+        return next(gerar_pdf_cenarios_partes(df, metrics, figures, user_name, agrupar_por, linhas_por_parte=None))
+    pdf = _novo_pdf("Simulação de Cenários", user_name)
+    _capa_cenarios(pdf, metrics, figures)
+
     pdf.add_page()
     pdf.set_font('Arial', 'B', 12)
     pdf.set_text_color(0, 39, 118)
@@ -178,7 +359,7 @@ def gerar_pdf_cenarios(df, metrics, figures, user_name):
             pdf.ln()
         except: pass
 
-    return pdf.output(dest='S').encode('latin-1')
+    return _finalizar_pdf(pdf)
 
 # --- GERADOR DE EXCEL INTELIGENTE ---
 def gerar_excel_personalizado(df, titulo_planilha="Base de Dados"):